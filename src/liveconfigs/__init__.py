@@ -0,0 +1,6 @@
+def __getattr__(name):
+    # ленивый импорт: модели нельзя импортировать до загрузки приложений django
+    if name in ('snapshot', 'asnapshot'):
+        from liveconfigs import snapshots
+        return getattr(snapshots, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
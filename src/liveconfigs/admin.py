@@ -2,20 +2,59 @@ import json
 
 from django.conf import settings
 from django.contrib import admin
-from django.db.models import JSONField
-from django.utils import timezone
+from django.contrib.admin.views.main import ChangeList
+from django.db import connections
+from django.db.models import BooleanField, Case, F, JSONField, Q, TextField, Value, When
+from django.db.models.functions import Cast, Coalesce, Concat, Left, Length, Right
 from import_export import formats, resources
 from import_export.admin import ImportExportModelAdmin
 from import_export.fields import Field
 from tablib import Dataset
 
-from .filters import TagsListFilter
+from .filters import ChangedListFilter, TagsListFilter
 from .forms import ConfigRowForm, JSONWidget
-from .models import ConfigRow, HistoryEvent
+from .models import ConfigGeneration, ConfigRow, HistoryEvent
+from .models.history import event_value, record_history
+from .receivers import collect_saved_rows
 from .utils import get_excluded_rows
 
 
 MAX_VISUAL_VALUE_LENGTH = getattr(settings, 'LC_MAX_VISUAL_VALUE_LENGTH', 0)
+# SQLite хранит JSON с \uXXXX вместо не-ASCII символов, поэтому превью значения там строится в python
+SQL_PREVIEW_VENDORS = ('postgresql', 'mysql')
+
+
+def truncate_value(value: str) -> str:
+    if 0 < MAX_VISUAL_VALUE_LENGTH < len(value):
+        value = value[:MAX_VISUAL_VALUE_LENGTH//2] + " ... " + value[-MAX_VISUAL_VALUE_LENGTH//2:]
+    return value
+
+
+def annotate_value_preview(queryset):
+    """Текст значения (усеченный как truncate_value) считает БД, чтобы список не тянул значения целиком"""
+    queryset = queryset.annotate(value_text=Coalesce(Cast('value', TextField()), Value('null'), output_field=TextField()))
+    if MAX_VISUAL_VALUE_LENGTH <= 0:
+        return queryset.annotate(value_preview=F('value_text'))
+    return queryset.annotate(value_length=Length('value_text')).annotate(value_preview=Case(
+        When(value_length__gt=MAX_VISUAL_VALUE_LENGTH, then=Concat(
+            Left('value_text', MAX_VISUAL_VALUE_LENGTH // 2),
+            Value(" ... "),
+            Right('value_text', -(-MAX_VISUAL_VALUE_LENGTH // 2)),
+            output_field=TextField(),
+        )),
+        default=F('value_text'),
+        output_field=TextField(),
+    ))
+
+
+class ConfigRowChangeList(ChangeList):
+    """Список конфигов без полных value и default_value: превью значения и признак изменения считает БД"""
+
+    def get_queryset(self, request, *args, **kwargs):
+        queryset = super().get_queryset(request, *args, **kwargs)
+        if 'value_preview' in queryset.query.annotations:
+            queryset = queryset.defer('value', 'default_value')
+        return queryset
 
 
 class ConfigRowResource(resources.ModelResource):
@@ -43,10 +82,16 @@ class ConfigRowResource(resources.ModelResource):
             if row_name in excluded_config_rows:
                 del dataset[i]
 
-        return super().import_data_inner(
-            dataset, dry_run, raise_errors, using_transactions, collect_failed_rows,
-            rollback_on_validation_errors=rollback_on_validation_errors, **kwargs
-        )
+        # поколение увеличивается один раз на весь импорт, а не на каждую сохраненную строку.
+        # import_data_inner выполняется внутри транзакции импорта, bump откатится вместе с ней
+        with collect_saved_rows() as saved_rows:
+            result = super().import_data_inner(
+                dataset, dry_run, raise_errors, using_transactions, collect_failed_rows,
+                rollback_on_validation_errors=rollback_on_validation_errors, **kwargs
+            )
+        if saved_rows and not dry_run:
+            ConfigGeneration.bump(rows=saved_rows)
+        return result
 
 
 class ConfigRowAdmin(ImportExportModelAdmin):
@@ -61,37 +106,62 @@ class ConfigRowAdmin(ImportExportModelAdmin):
     resource_class = ConfigRowResource
     list_display = ('name', 'value_mod', 'is_changed', 'description', 'topic', 'tags', 'last_read', 'last_set')
     fields = ('name', 'value', 'default_value', 'is_changed', 'description', 'topic', 'tags', 'last_read', 'last_set')
-    list_filter = ("topic", TagsListFilter,)
+    list_filter = ("topic", TagsListFilter, ChangedListFilter)
     readonly_fields = ('name', 'description', 'topic', 'tags', 'last_read', 'last_set', 'default_value', 'is_changed')
     search_fields = ('name', 'description', 'topic', 'tags')
     actions = ['set_selected_config_rows_to_default']
 
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request).annotate(changed=Case(
+            When(Q(value=F('default_value')) | Q(value__isnull=True, default_value__isnull=True), then=Value(False)),
+            default=Value(True),
+            output_field=BooleanField(),
+        ))
+        if connections[queryset.db].vendor in SQL_PREVIEW_VENDORS:
+            queryset = annotate_value_preview(queryset)
+        return queryset
+
+    def get_changelist(self, request, **kwargs):
+        return ConfigRowChangeList
+
+    def get_export_queryset(self, request):
+        # экспорту нужны полные значения
+        return super().get_export_queryset(request).defer(None)
+
+    @admin.display(ordering="changed")
     def is_changed(self, obj):
-        return '▢' if obj.value == obj.default_value else '☑'
+        changed = obj.changed if hasattr(obj, 'changed') else obj.value != obj.default_value
+        return '☑' if changed else '▢'
 
     @admin.display(description="value", ordering="value")
     def value_mod(self, obj):
-        value = json.dumps(obj.value, ensure_ascii=False)
-        if 0 < MAX_VISUAL_VALUE_LENGTH < len(value):
-            value = value[:MAX_VISUAL_VALUE_LENGTH//2] + " ... " + value[-MAX_VISUAL_VALUE_LENGTH//2:]
-        return value
+        if hasattr(obj, 'value_preview'):
+            return obj.value_preview
+        return truncate_value(json.dumps(obj.value, ensure_ascii=False))
 
     def save_model(self, request, obj, form, change):
         user = request.user
         super().save_model(request, obj, form, change)
-        HistoryEvent.objects.create(name=obj.name, value=obj.value, edit_at=timezone.now(), edit_by=user)
+        record_history([(obj.name, obj.value)], user)
 
     def set_selected_config_rows_to_default(self, request, queryset):
         user = request.user
-        config_rows, history_events = [], []
-        for config_row in queryset:
+        config_rows = []
+        for config_row in queryset.defer(None):
             config_row.value = config_row.default_value
-            history_event = HistoryEvent(name=config_row.name, value=config_row.default_value,
-                                         edit_at=timezone.now(), edit_by=user)
             config_rows.append(config_row)
-            history_events.append(history_event)
         ConfigRow.objects.bulk_update(config_rows, ["value"])
-        HistoryEvent.objects.bulk_create(history_events)
+        ConfigGeneration.bump(rows=config_rows)
+        record_history([(config_row.name, config_row.value) for config_row in config_rows], user)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        ConfigGeneration.bump(deleted_names=[obj.name])
+
+    def delete_queryset(self, request, queryset):
+        names = list(queryset.values_list('name', flat=True))
+        super().delete_queryset(request, queryset)
+        ConfigGeneration.bump(deleted_names=names)
 
 
 @admin.register(HistoryEvent)
@@ -113,10 +183,15 @@ class HistoryEventAdmin(admin.ModelAdmin):
 
     @admin.display(description="value", ordering="value")
     def value_mod(self, obj):
-        value = json.dumps(obj.value, ensure_ascii=False)
-        if 0 < MAX_VISUAL_VALUE_LENGTH < len(value):
-            value = value[:MAX_VISUAL_VALUE_LENGTH//2] + " ... " + value[-MAX_VISUAL_VALUE_LENGTH//2:]
-        return value
+        # в списке патч не восстанавливается до полного значения, чтобы не читать цепочку событий на каждую строку
+        value = truncate_value(json.dumps(obj.value, ensure_ascii=False))
+        return f"patch: {value}" if obj.is_patch else value
+
+    def get_object(self, request, object_id, from_field=None):
+        obj = super().get_object(request, object_id, from_field)
+        if obj is not None and obj.is_patch:
+            obj.value = event_value(obj)
+        return obj
 
     def get_form(self, *args, **kwargs):
 
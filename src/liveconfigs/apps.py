@@ -1,5 +1,40 @@
+import logging
+import warnings
+from importlib import import_module
+
 from django.apps import AppConfig
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+logger = logging.getLogger(__name__)
 
 
 class LiveconfigsConfig(AppConfig):
     name = 'liveconfigs'
+
+    def ready(self):
+        from liveconfigs import receivers  # noqa: F401
+
+        if getattr(settings, 'LC_PRELOAD_ON_STARTUP', False):
+            self.preload()
+
+    @staticmethod
+    def preload():
+        """Загрузка всех конфигов при старте процесса (LC_PRELOAD_ON_STARTUP), чтобы первые запросы
+        после деплоя не ходили за ними в БД. Модули с классами конфигов перечисляются в LC_PRELOAD_MODULES"""
+        from liveconfigs.models.descriptors import preload
+
+        for module in getattr(settings, 'LC_PRELOAD_MODULES', ()):
+            import_module(module)
+        try:
+            with warnings.catch_warnings():
+                # обращение к БД при старте здесь намеренное и включается настройкой
+                warnings.filterwarnings('ignore', message='Accessing the database during app initialization',
+                                        category=RuntimeWarning)
+                preload()
+        except DatabaseError as exc:
+            # например, migrate на пустой БД: конфиги загрузятся лениво при первом чтении
+            logger.warning('liveconfigs preload skipped, database is not ready: %s', exc)
+        finally:
+            # соединение не должно достаться воркерам, которые форкнутся от этого процесса
+            connections.close_all()
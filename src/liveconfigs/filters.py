@@ -1,24 +1,103 @@
+from collections import Counter
+
 from django.contrib.admin import SimpleListFilter
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
 from django.utils.translation import gettext_lazy as _
 
+EMPTY_LOOKUP = "null"
+
+# разворачивание JSON-массива в строки на стороне БД: {столбец} заменяется на столбец с массивом
+JSON_ARRAY_ELEMENTS = {
+    'postgresql': "CROSS JOIN LATERAL jsonb_array_elements_text("
+                  "CASE WHEN jsonb_typeof({column}) = 'array' THEN {column} ELSE '[]'::jsonb END) AS e(value)",
+    'sqlite': "CROSS JOIN json_each(CASE WHEN json_type({column}) = 'array' THEN {column} ELSE '[]' END) AS e",
+}
+
+
+def empty_q(field) -> Q:
+    return Q(**{f"{field}__isnull": True}) | Q(**{field: []})
+
+
+def array_contains_q(queryset, field, values) -> Q:
+    """Условие "JSON-массив field содержит одно из values". На Postgres - has_any_keys (оператор ?|),
+    на SQLite has_any_keys ищет ключи объекта, а не элементы массива, поэтому массив разворачивается json_each,
+    на остальных базах - lookup contains"""
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        return Q(**{f"{field}__has_any_keys": values})
+    elements = JSON_ARRAY_ELEMENTS.get(connection.vendor)
+    if elements is None:
+        q = Q()
+        for value in values:
+            q |= Q(**{f"{field}__contains": [value]})
+        return q
+
+    opts = queryset.model._meta
+    quote = connection.ops.quote_name
+    sql = (
+        f"SELECT r.{quote(opts.pk.column)} FROM {quote(opts.db_table)} r "
+        f"{elements.format(column='r.' + quote(opts.get_field(field).column))} "
+        f"WHERE e.value IN ({', '.join(['%s'] * len(values))})"
+    )
+    return Q(pk__in=RawSQL(sql, list(values)))
+
+
+def count_array_values(queryset, field) -> tuple[dict[str, int], int]:
+    """Считает, в скольких строках queryset встречается каждое значение JSON-массива field.
+    На Postgres и SQLite считает БД одним запросом, на остальных базах - python.
+    Возвращает ({значение: число строк}, число строк с пустым field)"""
+    connection = connections[queryset.db]
+    elements = JSON_ARRAY_ELEMENTS.get(connection.vendor)
+    if elements is None:
+        counts = Counter()
+        for values in queryset.exclude(empty_q(field)).values_list(field, flat=True):
+            if isinstance(values, list):
+                counts.update({str(value) for value in values if value})
+        return dict(counts), queryset.filter(empty_q(field)).count()
+
+    opts = queryset.model._meta
+    quote = connection.ops.quote_name
+    pk = f"r.{quote(opts.pk.column)}"
+    subquery, params = queryset.values('pk').query.sql_with_params()
+    empty_subquery, empty_params = queryset.filter(empty_q(field)).values('pk').query.sql_with_params()
+    sql = (
+        f"SELECT e.value, COUNT(DISTINCT {pk}) FROM {quote(opts.db_table)} r "
+        f"{elements.format(column='r.' + quote(opts.get_field(field).column))} "
+        f"WHERE {pk} IN ({subquery}) GROUP BY e.value "
+        f"UNION ALL SELECT NULL, COUNT(*) FROM ({empty_subquery}) empty_rows"
+    )
+    counts, empty = {}, 0
+    with connection.cursor() as cursor:
+        cursor.execute(sql, (*params, *empty_params))
+        for value, count in cursor.fetchall():
+            if value is None:
+                empty = count
+            elif value:
+                counts[str(value)] = count
+    return counts, empty
+
 
 class JSONFieldListFilter(SimpleListFilter):
     """An admin list filter for ArrayFields."""
 
     def lookups(self, request, model_admin):
         """Return the filtered queryset."""
-        queryset_values = model_admin.model.objects.values_list(
-            self.parameter_name, flat=True
-        )
-        values = []
-        for sublist in queryset_values:
-            if sublist:
-                for value in sublist:
-                    if value:
-                        values.append((value, value))
-            else:
-                values.append(("null", "-"))
-        return sorted(set(values))
+        counts, empty = count_array_values(model_admin.model.objects.all(), self.parameter_name)
+        values = [(value, value) for value in counts]
+        if empty:
+            values.append((EMPTY_LOOKUP, "-"))
+        return sorted(values)
+
+    def get_facet_queryset(self, changelist):
+        # счетчики всех значений одним запросом вместо Count(filter=...) на каждое значение
+        filtered_qs = changelist.get_queryset(self.request, exclude_parameters=self.expected_parameters())
+        counts, empty = count_array_values(filtered_qs, self.parameter_name)
+        return {
+            f"{i}__c": empty if lookup == EMPTY_LOOKUP else counts.get(lookup, 0)
+            for i, (lookup, _title) in enumerate(self.lookup_choices)
+        }
 
     def get_lookup_next(self, filter_params: dict, lookup: str):
         parameter_name = self.parameter_name
@@ -82,15 +161,29 @@ class JSONFieldListFilter(SimpleListFilter):
         """Return the filtered queryset."""
         lookup_value = self.value()
         if lookup_value:
-            lookup_filter = (
-                {"{}__isnull".format(self.parameter_name): True}
-                if lookup_value == "null"
-                else {"{}__has_any_keys".format(self.parameter_name): lookup_value}
-            )
-            queryset = queryset.filter(**lookup_filter)
+            values = [value for value in lookup_value if value != EMPTY_LOOKUP]
+            lookup_filter = empty_q(self.parameter_name) if EMPTY_LOOKUP in lookup_value else Q()
+            if values:
+                lookup_filter |= array_contains_q(queryset, self.parameter_name, values)
+            queryset = queryset.filter(lookup_filter)
         return queryset
 
 
 class TagsListFilter(JSONFieldListFilter):
     title = "tags"
     parameter_name = "tags"
+
+
+class ChangedListFilter(SimpleListFilter):
+    """Фильтр по аннотации changed: значение отличается от значения по умолчанию"""
+
+    title = "is changed"
+    parameter_name = "changed"
+
+    def lookups(self, request, model_admin):
+        return (("1", _("Yes")), ("0", _("No")))
+
+    def queryset(self, request, queryset):
+        if self.value() in ("0", "1"):
+            return queryset.filter(changed=self.value() == "1")
+        return queryset
@@ -3,7 +3,7 @@ from types import UnionType
 from django import forms
 from django.conf import settings
 from django.forms import widgets
-from liveconfigs.models import ConfigRow
+from liveconfigs.models import ConfigMeta, ConfigRow
 
 
 ENABLE_PRETTY_INPUT = getattr(settings, 'LC_ENABLE_PRETTY_INPUT', False)
@@ -38,7 +38,7 @@ class ConfigRowForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        instance_type = self.instance.registered_row_types.get(self.instance.name)
+        instance_type = ConfigMeta.registry.row_type(self.instance.name)
         if ENABLE_PRETTY_INPUT and not isinstance(instance_type, UnionType):
             max_len = MAX_STR_LENGTH_DISPLAYED_AS_TEXTINPUT
             val = self.instance.value
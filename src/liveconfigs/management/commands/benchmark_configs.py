@@ -0,0 +1,174 @@
+import time
+import uuid
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from tablib import Dataset
+from typeguard import CollectionCheckStrategy, check_type
+
+from liveconfigs.admin import ConfigRowResource
+from liveconfigs.models import BaseConfig, ConfigMeta, ConfigRow
+from liveconfigs.models.descriptors import generation_check
+from liveconfigs.serializers import ConfigRowSerializer
+
+from .load_config import load_config
+
+DEFAULT_SIZES = (1000, 10000)
+DESCRIPTOR_READS = 100000
+EXPIRED_READS = 20
+VALUE_TYPE = dict[str, list[int]]
+
+
+def make_value(i):
+    return {f"key_{j}": [i, j] for j in range(5)}
+
+
+def make_config_class(size):
+    """Синтетический класс конфигов на size штук. Регистрируется в ConfigMeta.registry до конца процесса"""
+    prefix = f"LC_BENCH_{uuid.uuid4().hex[:8]}_"
+    dct = {'__prefix__': prefix, '__topic__': 'Benchmark', '__annotations__': {}}
+    for i in range(size):
+        dct[f"C{i}"] = make_value(i)
+        dct['__annotations__'][f"C{i}"] = VALUE_TYPE
+    return ConfigMeta(f"Benchmark{size}", (BaseConfig,), dct)
+
+
+def group_of(config_class):
+    return config_class.get_descriptor('C0').group
+
+
+class QueryCounter:
+    """Считает запросы через execute_wrapper: в отличие от CaptureQueriesContext не ограничен 9000 запросов"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Замер времени и числа запросов на горячих путях liveconfigs. '
+            'Все изменения в БД откатываются, запускать на тестовой БД')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            nargs='+',
+            type=int,
+            default=list(DEFAULT_SIZES),
+            help='Количество конфигов в замерах (по умолчанию 1000 10000)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Сколько раз повторять каждый замер, берется лучший результат'
+        )
+
+    def handle(self, *args, **kwargs):
+        self.repeat = kwargs['repeat']
+        self.stdout.write(f"БД: {connection.vendor}")
+        self.stdout.write(f"{'замер':<40} {'конфигов':>9} {'вызовов':>8} {'мс всего':>10} "
+                          f"{'мкс/вызов':>11} {'запросов':>9}")
+        for size in kwargs['sizes']:
+            try:
+                with transaction.atomic():
+                    self.run_suite(size)
+                    raise Rollback
+            except Rollback:
+                pass
+
+    def measure(self, label, size, func, calls=1, setup=None):
+        """Лучшее время из self.repeat прогонов, запросы считаются по последнему"""
+        best, queries = None, 0
+        for _ in range(self.repeat):
+            if setup is not None:
+                setup()
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                started = time.perf_counter()
+                for _ in range(calls):
+                    func()
+                elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+            queries = counter.count
+        self.stdout.write(f"{label:<40} {size:>9} {calls:>8} {best * 1000:>10.2f} "
+                          f"{best / calls * 1e6:>11.2f} {queries:>9}")
+
+    def run_suite(self, size):
+        config_class = make_config_class(size)
+        group = group_of(config_class)
+        descriptors = group.descriptors
+        names = [descriptor.config_name for descriptor in descriptors]
+
+        def reset_rows():
+            ConfigRow.objects.filter(name__in=names).delete()
+
+        self.measure('load_config: создание', size,
+                     lambda: load_config(descriptors=descriptors), setup=reset_rows)
+        self.measure('load_config: без изменений', size, lambda: load_config(descriptors=descriptors))
+
+        # первое чтение сверяет метаданные группы, в замеры оно не входит
+        config_class.C0
+        self.measure('__get__: попадание в кеш', size, lambda: config_class.C0, calls=DESCRIPTOR_READS)
+
+        def expire():
+            group.expire()
+            generation_check.checked_at = None
+
+        def expire_and_reload():
+            expire()
+            for descriptor in descriptors:
+                descriptor.generation = None
+
+        self.measure('__get__: TTL истек, поколение то же', size, lambda: (expire(), config_class.C0),
+                     calls=EXPIRED_READS)
+        self.measure('__get__: TTL истек, перечитывание', size, lambda: (expire_and_reload(), config_class.C0),
+                     calls=EXPIRED_READS)
+
+        payload = [{'name': name, 'value': make_value(i + 1)} for i, name in enumerate(names)]
+
+        def import_api():
+            serializer = ConfigRowSerializer(data=payload)
+            assert not serializer.validate_configs()
+            serializer.update_configs()
+
+        self.measure('import_config API (update_configs)', size, import_api,
+                     setup=lambda: load_config(reset=True, descriptors=descriptors))
+
+        datasets = []
+
+        def prepare_import_admin():
+            # импорт меняет dataset на месте, поэтому на каждый прогон свой
+            load_config(reset=True, descriptors=descriptors)
+            datasets[:] = [Dataset(*[(config['name'], config['value']) for config in payload],
+                                   headers=['name', 'value'])]
+
+        def import_admin():
+            result = ConfigRowResource().import_data(datasets[0])
+            assert not result.has_errors()
+
+        self.measure('admin: импорт ConfigRowResource', size, import_admin, setup=prepare_import_admin)
+
+        user = get_user_model().objects.create_superuser(
+            f"lc_bench_{uuid.uuid4().hex[:8]}", 'bench@example.com', uuid.uuid4().hex
+        )
+        request = RequestFactory().get('/admin/liveconfigs/configrow/')
+        request.user = user
+        model_admin = admin.site._registry[ConfigRow]
+        self.measure('admin: список конфигов', size, lambda: model_admin.changelist_view(request).render())
+
+        config_row = ConfigRow(name=names[0], value={f"key_{j}": list(range(10)) for j in range(size)})
+        self.measure('validate_type: typeguard', size, lambda: check_type(
+            config_row.value, VALUE_TYPE, collection_check_strategy=CollectionCheckStrategy.ALL_ITEMS
+        ))
+        self.measure('validate_type: ConfigRow.validate_type', size, config_row.validate_type)
@@ -0,0 +1,34 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from liveconfigs.metrics import config_metrics, render_prometheus
+from liveconfigs.models import ConfigMeta, config_refresher
+
+
+class Command(BaseCommand):
+    help = ('Вывести метрики конфигов. Метрики копятся в памяти каждого процесса, поэтому без --probe '
+            'команда покажет только счетчики своего процесса; метрики воркеров смотрите через API /metrics/')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--probe',
+            action='store_true',
+            default=False,
+            help='Перед выводом один раз перечитать все конфиги, чтобы замерить время запросов к БД'
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            default=False,
+            help='Вывести метрики в JSON вместо текстового формата Prometheus'
+        )
+
+    def handle(self, *args, **kwargs):
+        if kwargs['probe']:
+            for group in ConfigMeta.registry.groups:
+                group.refresh(force=True)
+        if kwargs['json']:
+            self.stdout.write(json.dumps(config_metrics.as_dict(), indent=2))
+        else:
+            self.stdout.write(render_prometheus(config_refresher.stats()), ending='')
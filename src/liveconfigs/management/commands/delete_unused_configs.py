@@ -1,25 +1,109 @@
-from django.core.management.base import BaseCommand
+import datetime as dt
+import json
 
-from liveconfigs.models import ConfigRow
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from liveconfigs.models import ConfigGeneration, ConfigRow
 from liveconfigs.utils import get_actual_config_names
 
+EXPORT_FIELDS = ('name', 'value', 'topic', 'description', 'tags', 'default_value', 'last_read', 'last_set')
+
 
 class Command(BaseCommand):
-    help = 'Удалить конфиги, которые есть в БД, но нет в коде'
+    help = ('Удалить конфиги, которые есть в БД, но нет в коде. С --not-read-since - только те из них, '
+            'которые не читались указанное число дней')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--noinput', '--no-input',
+            action='store_false',
+            dest='interactive',
+            default=True,
+            help='Удалять без подтверждения (для CI и задач по расписанию)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            default=False,
+            help='Только вывести конфиги, которые будут удалены'
+        )
+        parser.add_argument(
+            '--not-read-since',
+            type=int,
+            metavar='DAYS',
+            help='Удалять только конфиги, которые не читались DAYS дней (last_read пустой или старше)'
+        )
+        parser.add_argument(
+            '--include-declared',
+            action='store_true',
+            default=False,
+            help='Вместе с --not-read-since: удалять и конфиги, которые есть в коде'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Сколько конфигов удалять одной транзакцией'
+        )
+        parser.add_argument(
+            '--export',
+            metavar='PATH',
+            help='Перед удалением сохранить конфиги в JSON-файл (формат подходит для import_config)'
+        )
 
     def handle(self, *args, **kwargs):
-        actual_configs = get_actual_config_names()
-        unused_configs = ConfigRow.objects.exclude(name__in=actual_configs)
+        if kwargs['include_declared'] and kwargs['not_read_since'] is None:
+            raise CommandError("--include-declared используется только вместе с --not-read-since")
+
+        candidates = ConfigRow.objects.all()
+        if not kwargs['include_declared']:
+            candidates = candidates.exclude(name__in=get_actual_config_names())
+        if kwargs['not_read_since'] is not None:
+            read_after = timezone.now() - dt.timedelta(days=kwargs['not_read_since'])
+            candidates = candidates.filter(Q(last_read__isnull=True) | Q(last_read__lt=read_after))
 
-        if not unused_configs:
-            print("Нет неиспользуемых конфигов")
+        # кандидаты читаются из БД один раз, дальше работаем со списком имен
+        names = list(candidates.order_by('name').values_list('name', flat=True))
+        if not names:
+            self.stdout.write("Нет неиспользуемых конфигов")
             return
 
-        names_to_delete = "\n".join([c.name for c in unused_configs])
-        print(f"Будут удалены {len(unused_configs)} конфигов:")
-        print(names_to_delete)
+        self.stdout.write(f"Будут удалены {len(names)} конфигов:")
+        self.stdout.write("\n".join(names))
+        if kwargs['dry_run']:
+            return
+
+        if kwargs['export']:
+            self.export(names, kwargs['export'], kwargs['batch_size'])
+            self.stdout.write(f"Конфиги сохранены в {kwargs['export']}")
+
+        if kwargs['interactive']:
+            ack = input("Вы точно хотите удалить конфиги из списка выше? (y/n)\n")
+            if ack != "y":
+                return
+
+        deleted = 0
+        batch_size = kwargs['batch_size']
+        for start in range(0, len(names), batch_size):
+            with transaction.atomic():
+                # условия проверяются еще раз: конфиг могли прочитать после выборки
+                batch = list(candidates.filter(name__in=names[start:start + batch_size])
+                             .select_for_update().values_list('name', flat=True))
+                if not batch:
+                    continue
+                ConfigRow.objects.filter(name__in=batch).delete()
+                ConfigGeneration.bump(deleted_names=batch)
+            deleted += len(batch)
+        self.stdout.write(f"Удалено {deleted} неиспользуемых конфигов")
 
-        ack = input("Вы точно хотите удалить конфиги из списка выше? (y/n)\n")
-        if ack == "y":
-            unused_configs.delete()
-            print("Неиспользуемые конфиги удалены")
+    def export(self, names, path, batch_size):
+        rows = []
+        for start in range(0, len(names), batch_size):
+            rows += ConfigRow.objects.filter(name__in=names[start:start + batch_size]).order_by('name').values(
+                *EXPORT_FIELDS)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, cls=DjangoJSONEncoder, ensure_ascii=False, indent=2)
@@ -1,48 +1,74 @@
 import datetime as dt
+import json
 import logging
 
-from django.core import exceptions
 from django.core.management.base import BaseCommand
+from django.db import transaction
 
-from liveconfigs.models import (DESCRIPTION_SUFFIX, TAGS_SUFFIX,
-                                VALIDATORS_SUFFIX, BaseConfig, ConfigRow)
+from liveconfigs.models import ConfigGeneration, ConfigMeta, ConfigRow
+from liveconfigs.models.metadata import METADATA_FIELDS
 
 logger = logging.getLogger(__name__)
 
+UPDATE_FIELDS = ('value', 'last_set') + METADATA_FIELDS
+BATCH_SIZE = 500
 
-def save_row(instance_row, reset=False):
-    logger.debug(f'save config row {instance_row.config_name}')
-    try:
-        db_row = ConfigRow.objects.get(name=instance_row.config_name)
-        if reset or db_row.value is None:
-            db_row.value = instance_row.last_value
-            db_row.last_set = dt.datetime.now(tz=dt.timezone.utc)
-        db_row.description = instance_row.description
-        db_row.tags = instance_row.tags
-        db_row.topic = instance_row.topic
-        db_row.default_value = instance_row.default_value
-        db_row.save()
-    except exceptions.ObjectDoesNotExist:
-        ConfigRow.objects.create(
-            name=instance_row.config_name,
-            value=instance_row.last_value,
-            description=instance_row.description,
-            tags=instance_row.tags,
-            topic=instance_row.topic,
-            last_set=dt.datetime.now(tz=dt.timezone.utc),
-            default_value=instance_row.default_value,
-        )
 
+def plan_config(descriptors, existing_rows, reset=False):
+    """Считает, какие строки надо создать, а какие обновить.
+    Возвращает (строки для создания, [(строка для обновления, {поле: (было, стало)})])"""
+    now = dt.datetime.now(tz=dt.timezone.utc)
+    to_create, to_update = [], []
+    # значения берутся из кода (default_value): last_value к этому моменту мог загрузиться из БД,
+    # например, при LC_PRELOAD_ON_STARTUP, и тогда --reset ничего бы не сбросил
+    for descriptor in descriptors:
+        db_row = existing_rows.get(descriptor.config_name)
+        if db_row is None:
+            to_create.append(ConfigRow(
+                name=descriptor.config_name,
+                value=descriptor.default_value,
+                description=descriptor.description,
+                tags=descriptor.tags,
+                topic=descriptor.topic,
+                last_set=now,
+                default_value=descriptor.default_value,
+            ))
+            continue
+
+        changes = {}
+        if (reset or db_row.value is None) and db_row.value != descriptor.default_value:
+            changes['value'] = (db_row.value, descriptor.default_value)
+            changes['last_set'] = (db_row.last_set, now)
+        for field in METADATA_FIELDS:
+            if getattr(db_row, field) != getattr(descriptor, field):
+                changes[field] = (getattr(db_row, field), getattr(descriptor, field))
+        if changes:
+            for field, (_, new) in changes.items():
+                setattr(db_row, field, new)
+            to_update.append((db_row, changes))
+    return to_create, to_update
+
+
+def load_config(reset=False, dry_run=False, descriptors=None, **kwargs):
+    """descriptors - какие конфиги загружать, по умолчанию все объявленные в коде"""
+    if descriptors is None:
+        descriptors = list(ConfigMeta.registry.descriptors.values())
+    existing_rows = ConfigRow.objects.in_bulk([descriptor.config_name for descriptor in descriptors])
+    to_create, to_update = plan_config(descriptors, existing_rows, reset=reset)
+    if dry_run or not (to_create or to_update):
+        return to_create, to_update
+
+    updated_rows = [db_row for db_row, _ in to_update]
+    with transaction.atomic():
+        ConfigRow.objects.bulk_create(to_create, batch_size=BATCH_SIZE)
+        ConfigRow.objects.bulk_update(updated_rows, UPDATE_FIELDS, batch_size=BATCH_SIZE)
+        ConfigGeneration.bump(rows=to_create + updated_rows)
+    logger.info(f"{len(to_create)} configs created, {len(to_update)} configs updated")
+    return to_create, to_update
 
-def load_config(reset=False, **kwargs):
-    subclasses = set(BaseConfig.__subclasses__())
-    for config in subclasses:
-        for name, row in config.__dict__.items():
-            if not any(
-                [name.startswith('__'), name.endswith((DESCRIPTION_SUFFIX, TAGS_SUFFIX, VALIDATORS_SUFFIX))]
-            ):
-                save_row(row, reset=reset)
-        logger.info(f"Config '{config.__name__}' load successfully")
+
+def dumps(value):
+    return json.dumps(value, ensure_ascii=False, default=str)
 
 
 class Command(BaseCommand):
@@ -50,7 +76,16 @@ class Command(BaseCommand):
 
     def handle(self, *args, **kwargs):
         logger.info('Load started')
-        load_config(**kwargs)
+        to_create, to_update = load_config(**kwargs)
+        if kwargs.get('dry_run'):
+            for db_row in to_create:
+                self.stdout.write(f"+ {db_row.name} = {dumps(db_row.value)}")
+            for db_row, changes in to_update:
+                self.stdout.write(f"~ {db_row.name}")
+                for field, (old, new) in changes.items():
+                    self.stdout.write(f"    {field}: {dumps(old)} -> {dumps(new)}")
+            self.stdout.write(f"Будет создано {len(to_create)}, обновлено {len(to_update)} конфигов")
+            return
         logger.info('All configs load successfully')
 
     def add_arguments(self, parser):
@@ -61,3 +96,9 @@ class Command(BaseCommand):
             default=False,
             help='Сбросить конфиги'
         )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            default=False,
+            help='Только показать, что будет создано и изменено, ничего не записывая'
+        )
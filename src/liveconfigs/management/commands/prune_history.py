@@ -0,0 +1,52 @@
+import datetime as dt
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from liveconfigs.models.history import prune_history, pruned_events
+
+RETENTION_DAYS = getattr(settings, 'LC_HISTORY_RETENTION_DAYS', 365)
+
+
+class Command(BaseCommand):
+    help = ('Удалить события истории конфигов старше срока хранения. Удаление идет короткими транзакциями '
+            'по --batch-size строк, чтобы не держать долгих блокировок на таблице истории')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=RETENTION_DAYS,
+            help=f'Сколько дней хранить историю (по умолчанию LC_HISTORY_RETENTION_DAYS = {RETENTION_DAYS})'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько событий удалять одной транзакцией'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0,
+            help='Пауза в секундах между пачками, чтобы не нагружать БД'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            default=False,
+            help='Только посчитать события, которые будут удалены'
+        )
+
+    def handle(self, *args, **kwargs):
+        before = timezone.now() - dt.timedelta(days=kwargs['days'])
+        if kwargs['dry_run']:
+            count = pruned_events(before)[0].count()
+            self.stdout.write(f"Будут удалены {count} событий истории старше {before:%Y-%m-%d %H:%M}")
+            return
+
+        pause = (lambda: time.sleep(kwargs['sleep'])) if kwargs['sleep'] > 0 else None
+        deleted = prune_history(before, batch_size=kwargs['batch_size'], pause=pause)
+        self.stdout.write(f"Удалено {deleted} событий истории старше {before:%Y-%m-%d %H:%M}")
@@ -0,0 +1,121 @@
+import time
+
+from django.conf import settings
+
+# считать каждое чтение конфига (liveconfigs_hits_total). Остальные счетчики копятся только при обновлении из БД
+# и включены всегда, а этот добавляет работу в каждое чтение, поэтому выключен по умолчанию
+COUNT_HITS = getattr(settings, 'LC_METRICS_COUNT_HITS', False)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class ConfigMetrics:
+    """Счетчики одного конфига в текущем процессе. Обновляются без блокировок, поэтому при
+    конкурентных обновлениях из разных потоков возможна небольшая погрешность"""
+
+    __slots__ = ('hits', 'refreshes', 'db_queries', 'db_time', 'defaults', 'signals', 'errors', 'refreshed_at')
+
+    def __init__(self):
+        self.hits = 0
+        self.refreshes = 0
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.defaults = 0
+        self.signals = 0
+        self.errors = 0
+        self.refreshed_at = None
+
+    def as_dict(self, now) -> dict:
+        data = {name: getattr(self, name) for name in self.__slots__ if name != 'refreshed_at'}
+        data['staleness'] = None if self.refreshed_at is None else now - self.refreshed_at
+        return data
+
+
+class MetricsRegistry:
+    """Метрики конфигов процесса: по конфигу и общие счетчики проверок поколения"""
+
+    def __init__(self):
+        self.configs = {}
+        self.generation_checks = 0
+        self.generation_check_time = 0.0
+
+    def get(self, config_name) -> ConfigMetrics:
+        metrics = self.configs.get(config_name)
+        if metrics is None:
+            metrics = self.configs.setdefault(config_name, ConfigMetrics())
+        return metrics
+
+    def record_db_query(self, names, elapsed):
+        # время запроса засчитывается каждому конфигу, который этим запросом читался
+        for name in names:
+            metrics = self.get(name)
+            metrics.db_queries += 1
+            metrics.db_time += elapsed
+
+    def record_generation_check(self, elapsed):
+        self.generation_checks += 1
+        self.generation_check_time += elapsed
+
+    def as_dict(self) -> dict:
+        now = time.monotonic()
+        return {
+            'configs': {name: metrics.as_dict(now) for name, metrics in sorted(self.configs.items())},
+            'generation_checks': self.generation_checks,
+            'generation_check_time': self.generation_check_time,
+        }
+
+
+config_metrics = MetricsRegistry()
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_prometheus(refresher_stats=None) -> str:
+    """Метрики в текстовом формате Prometheus"""
+    data = config_metrics.as_dict()
+    families = [
+        ('liveconfigs_refreshes_total', 'counter', 'refreshes', 'Config refreshes after TTL expiry'),
+        ('liveconfigs_db_queries_total', 'counter', 'db_queries', 'DB queries that read the config row'),
+        ('liveconfigs_db_seconds_total', 'counter', 'db_time', 'Time of DB queries that read the config row'),
+        ('liveconfigs_defaults_total', 'counter', 'defaults', 'Default value used because the row was missing'),
+        ('liveconfigs_signals_total', 'counter', 'signals', 'config_row_update_signal emissions'),
+        ('liveconfigs_refresh_errors_total', 'counter', 'errors', 'Failed refreshes served with last known values'),
+        ('liveconfigs_staleness_seconds', 'gauge', 'staleness', 'Seconds since the last successful refresh'),
+    ]
+    if COUNT_HITS:
+        families.insert(0, ('liveconfigs_hits_total', 'counter', 'hits', 'Config reads'))
+
+    lines = []
+    for metric, metric_type, key, help_text in families:
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} {metric_type}')
+        for name, values in data['configs'].items():
+            if values[key] is not None:
+                lines.append(f'{metric}{{config="{escape_label(name)}"}} {values[key]}')
+
+    lines += [
+        '# HELP liveconfigs_generation_checks_total Config generation checks',
+        '# TYPE liveconfigs_generation_checks_total counter',
+        f'liveconfigs_generation_checks_total {data["generation_checks"]}',
+        '# HELP liveconfigs_generation_check_seconds_total Time of config generation checks',
+        '# TYPE liveconfigs_generation_check_seconds_total counter',
+        f'liveconfigs_generation_check_seconds_total {data["generation_check_time"]}',
+    ]
+    if refresher_stats and refresher_stats['cycles']:
+        lines += [
+            '# HELP liveconfigs_refresher_cycles_total Background refresh cycles',
+            '# TYPE liveconfigs_refresher_cycles_total counter',
+            f'liveconfigs_refresher_cycles_total {refresher_stats["cycles"]}',
+            '# HELP liveconfigs_refresher_errors_total Failed background refresh cycles',
+            '# TYPE liveconfigs_refresher_errors_total counter',
+            f'liveconfigs_refresher_errors_total {refresher_stats["errors"]}',
+        ]
+        if refresher_stats['lag'] is not None:
+            lines += [
+                '# HELP liveconfigs_refresher_lag_seconds Seconds since the last successful background refresh',
+                '# TYPE liveconfigs_refresher_lag_seconds gauge',
+                f'liveconfigs_refresher_lag_seconds {refresher_stats["lag"]}',
+            ]
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,19 @@
+import asyncio
+
+from django.utils.decorators import sync_and_async_middleware
+
+from liveconfigs.snapshots import asnapshot, snapshot
+
+
+@sync_and_async_middleware
+def config_snapshot_middleware(get_response):
+    """Каждый запрос видит согласованные значения конфигов: снимок фиксируется на входе в запрос"""
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            async with asnapshot():
+                return await get_response(request)
+    else:
+        def middleware(request):
+            with snapshot():
+                return get_response(request)
+    return middleware
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.9 on 2026-10-18 11:33
+
+from django.db import migrations, models
+
+
+def create_generation(apps, schema_editor):
+    ConfigGeneration = apps.get_model('liveconfigs', 'ConfigGeneration')
+    ConfigGeneration.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('liveconfigs', '0005_configrow_tags'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConfigGeneration',
+            fields=[
+                ('id', models.PositiveSmallIntegerField(default=1, primary_key=True, serialize=False)),
+                ('generation', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_generation, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.9 on 2026-10-18 12:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('liveconfigs', '0006_configgeneration'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historyevent',
+            name='is_patch',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='historyevent',
+            index=models.Index(fields=['name', '-edit_at'], name='lc_history_name_edit_at'),
+        ),
+        migrations.AddIndex(
+            model_name='historyevent',
+            index=models.Index(fields=['edit_at'], name='lc_history_edit_at'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.9 on 2026-10-18 12:05
+
+from django.db import migrations, models
+
+
+def set_versions(apps, schema_editor):
+    # существующие строки получают новое поколение, а запросы изменений с более ранних поколений отдаются целиком
+    ConfigGeneration = apps.get_model('liveconfigs', 'ConfigGeneration')
+    ConfigRow = apps.get_model('liveconfigs', 'ConfigRow')
+    generation, _ = ConfigGeneration.objects.get_or_create(pk=1)
+    generation.generation += 1
+    generation.last_delete = generation.generation
+    generation.save()
+    ConfigRow.objects.update(version=generation.generation)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('liveconfigs', '0007_historyevent_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='configgeneration',
+            name='last_delete',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='configrow',
+            name='version',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(set_versions, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,8 @@
-from .descriptors import (DESCRIPTION_SUFFIX, TAGS_SUFFIX, VALIDATORS_SUFFIX,
-                          BaseConfig, ConfigMeta, ConfigRowDescriptor)
-from .models import ConfigRow, HistoryEvent
+from .descriptors import (DESCRIPTION_SUFFIX, TAGS_SUFFIX, TTL_SUFFIX, VALIDATORS_SUFFIX,
+                          BaseConfig, ConfigMeta, ConfigRowDescriptor, config_refresher)
+from .models import ConfigGeneration, ConfigRow, HistoryEvent
 
 __all__ = [
     "BaseConfig", "ConfigMeta", "ConfigRowDescriptor", "ConfigRow", "TAGS_SUFFIX", "DESCRIPTION_SUFFIX",
-    "VALIDATORS_SUFFIX", "HistoryEvent"
+    "VALIDATORS_SUFFIX", "TTL_SUFFIX", "HistoryEvent", "ConfigGeneration", "config_refresher"
 ]
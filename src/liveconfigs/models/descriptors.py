@@ -1,11 +1,27 @@
 import datetime as dt
 import logging
+import math
+import os
+import random
+import threading
 import time
+from contextvars import ContextVar
+from time import monotonic
+from types import MappingProxyType
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.core import exceptions
+from django.db import DatabaseError, transaction
 
-from liveconfigs.models.models import ConfigRow
+from liveconfigs import shared_cache
+from liveconfigs.metrics import COUNT_HITS, config_metrics
+from liveconfigs.models.last_read import LastReadTracker
+from liveconfigs.models.metadata import sync_metadata
+from liveconfigs.models.registry import ConfigRegistry
+from liveconfigs.models.remote import RemoteConfigs
+from liveconfigs.models.snapshot_file import SnapshotFile
+from liveconfigs.models.models import ConfigGeneration, ConfigRow
+from liveconfigs.refresher import ConfigRefresher
 from liveconfigs.signals import config_row_update_signal
 
 logger = logging.getLogger()
@@ -13,69 +29,390 @@ logger = logging.getLogger()
 DESCRIPTION_SUFFIX = "_DESCRIPTION"
 TAGS_SUFFIX = "_TAGS"
 VALIDATORS_SUFFIX = "_VALIDATORS"
+TTL_SUFFIX = "_TTL"
 
 
 CACHE_TTL = getattr(settings, 'LC_CACHE_TTL', 1)
+# случайная добавка к TTL (доля от TTL), чтобы одновременно запущенные процессы не ходили в БД синхронно
+CACHE_TTL_JITTER = getattr(settings, 'LC_CACHE_TTL_JITTER', 0.1)
+# lazy - конфиг перечитывается при обращении после истечения TTL,
+# background - конфиги обновляет фоновый поток, а чтение всегда берет последнее известное значение
+REFRESH_MODE = getattr(settings, 'LC_REFRESH_MODE', 'lazy')
+REFRESH_INTERVAL = getattr(settings, 'LC_REFRESH_INTERVAL', CACHE_TTL)
+
+# адрес configrow/snapshot/ другого инстанса liveconfigs: значения берутся оттуда, а не из своей БД
+REMOTE_URL = getattr(settings, 'LC_REMOTE_URL', None)
+# заголовки запросов к нему, например {"Authorization": "Token ..."}
+REMOTE_HEADERS = getattr(settings, 'LC_REMOTE_HEADERS', {})
+REMOTE_TIMEOUT = getattr(settings, 'LC_REMOTE_TIMEOUT', 5)
+
+# сверять описание, теги, топик и значение по умолчанию с БД при первом чтении конфигов в процессе.
+# С LC_REMOTE_URL своей БД конфигов нет, сверять не с чем
+SYNC_METADATA = getattr(settings, 'LC_SYNC_METADATA', True) and not REMOTE_URL
+
+# как часто процесс пишет в БД last_read прочитанных конфигов, сек
+LAST_READ_FLUSH_INTERVAL = getattr(settings, 'LC_LAST_READ_FLUSH_INTERVAL', 300)
+
+# файл с последними известными значениями конфигов для быстрого старта и на случай недоступности БД
+SNAPSHOT_FILE = getattr(settings, 'LC_SNAPSHOT_FILE', None)
+# как часто процесс может переписывать этот файл, сек
+SNAPSHOT_FILE_INTERVAL = getattr(settings, 'LC_SNAPSHOT_FILE_INTERVAL', 60)
+
+PRELOAD_BATCH_SIZE = 500
+
+
+# значения конфигов, зафиксированные liveconfigs.snapshot() для текущего запроса/задачи
+current_snapshot: ContextVar[MappingProxyType | None] = ContextVar('liveconfigs_snapshot', default=None)
+# связанный метод, чтобы не искать атрибут get при каждом чтении конфига
+get_current_snapshot = current_snapshot.get
+
+
+def jittered(ttl):
+    return ttl * (1 + random.uniform(0, CACHE_TTL_JITTER))
+
+
+def is_ttl_option(name, dct):
+    # SESSION_TTL без конфига SESSION в том же классе - обычный конфиг, а не TTL для него
+    return name.endswith(TTL_SUFFIX) and name[:-len(TTL_SUFFIX)] in dct
 
 
 class ConfigRowDescriptor:
     """ Кеширующий дескриптор для работы с конфигами """
 
-    def __init__(self, config_name, default_value, description=None, topic=None, tags=None):
+    __slots__ = ('config_name', 'row_type', 'ttl', 'default_value', 'last_value', 'next_check', 'generation',
+                 'read_marked', 'description', 'tags', 'topic', 'metrics', 'group')
+
+    def __init__(self, config_name, default_value, description=None, topic=None, tags=None, group=None,
+                 row_type=None, ttl=None):
         self.config_name = config_name
+        self.row_type = row_type
+        self.ttl = CACHE_TTL if ttl is None else ttl
         self.default_value = default_value
         self.last_value = default_value
-        self.next_check = None
+        # срок по time.monotonic(), после которого значение перечитывается. -inf - еще не загружено
+        self.next_check = -math.inf
+        self.generation = None
+        self.read_marked = False
         self.description = description
         self.tags = tags
         self.topic = topic
+        self.metrics = config_metrics.get(config_name)
+        self.group = group or ConfigRowGroup(config_name)
+        self.group.add(self)
+
+    def __get__(self, obj, klass=None):
+        # горячий путь: только чтения атрибутов и один вызов часов, пока не истек срок
+        if not self.read_marked:
+            last_read_tracker.mark(self)
+        snapshot = get_current_snapshot()
+        if snapshot is not None and self.config_name in snapshot:
+            return snapshot[self.config_name]
+        if monotonic() > self.next_check:
+            self.group.refresh()
+        return self.last_value
+
+    def metadata(self) -> dict:
+        return {
+            'description': self.description,
+            'tags': self.tags,
+            'topic': self.topic,
+            'default_value': self.default_value,
+        }
+
+    def load_row(self, db_row):
+        """Берет значение из строки БД. Метаданные здесь не сверяются, это делает metadata_sync,
+        а last_read пишет last_read_tracker"""
+        self.last_value = db_row.value
+
+    def load_default(self, dt_now):
+        """Берет значение по умолчанию. Возвращает поля для создания строки в БД"""
+        logger.warning('no config %s in db, using default value %s',
+                       self.config_name, self.default_value)
+        self.last_value = self.default_value
+        self.metrics.defaults += 1
+        return {
+            "name": self.config_name,
+            "value": self.last_value,
+            "description": self.description,
+            "tags": self.tags,
+            "topic": self.topic,
+            "last_read": dt_now,
+            "last_set": dt_now,
+            "default_value": self.default_value,
+        }
+
+
+class BackgroundConfigRowDescriptor(ConfigRowDescriptor):
+    """ Дескриптор для LC_REFRESH_MODE = "background". Значения обновляет config_refresher,
+    поэтому чтение не смотрит на часы и само ходит в БД только при первом обращении в процессе.
+    next_check здесь - inf, если значение уже обновляет config_refresher, иначе -inf """
+
+    __slots__ = ()
 
     def __get__(self, obj, klass=None):
-        now = time.time()
-        if not self.next_check or now > self.next_check:
+        if not self.read_marked:
+            last_read_tracker.mark(self)
+        snapshot = get_current_snapshot()
+        if snapshot is not None and self.config_name in snapshot:
+            return snapshot[self.config_name]
+        if self.next_check < math.inf:
+            self.group.refresh()
+        return self.last_value
+
+
+class HitCounterMixin:
+    """ Считает чтения конфига (LC_METRICS_COUNT_HITS) """
+
+    __slots__ = ()
+
+    def __get__(self, obj, klass=None):
+        self.metrics.hits += 1
+        return super().__get__(obj, klass)
+
+
+class CountingConfigRowDescriptor(HitCounterMixin, ConfigRowDescriptor):
+    __slots__ = ()
+
+
+class CountingBackgroundConfigRowDescriptor(HitCounterMixin, BackgroundConfigRowDescriptor):
+    __slots__ = ()
+
+
+def get_descriptor_class():
+    if REFRESH_MODE == 'background':
+        return CountingBackgroundConfigRowDescriptor if COUNT_HITS else BackgroundConfigRowDescriptor
+    return CountingConfigRowDescriptor if COUNT_HITS else ConfigRowDescriptor
+
+
+class ConfigRowGroup:
+    """ Группа дескрипторов (обычно один класс конфигов), которая обновляется из БД одним запросом """
+
+    def __init__(self, name):
+        self.name = name
+        self.descriptors = []
+        self.lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def add(self, descriptor):
+        self.descriptors.append(descriptor)
+
+    def expired(self, now):
+        """Дескрипторы, у которых истек собственный TTL"""
+        return [
+            descriptor for descriptor in self.descriptors
+            if now > descriptor.next_check
+        ]
+
+    def is_expired(self, now):
+        return any(now > descriptor.next_check for descriptor in self.descriptors)
+
+    def expire(self):
+        """Помечает все конфиги группы просроченными: следующее чтение пойдет за ними в БД"""
+        for descriptor in self.descriptors:
+            descriptor.next_check = -math.inf
+
+    @staticmethod
+    def is_actual(generation, descriptors):
+        # с прошлой загрузки конфиги в БД не менялись
+        return all(descriptor.generation == generation for descriptor in descriptors)
+
+    def refresh(self, force=False):
+        before_refresh()
+        # single-flight: БД читает один поток, остальные ждут на блокировке и получают его результат
+        with self.lock:
+            now = monotonic()
+            descriptors = self.descriptors if force else self.expired(now)
+            if not descriptors:
+                return
             dt_now = dt.datetime.now(tz=dt.timezone.utc)
             try:
-                logger.info('accessing db to grab config %s', self.config_name)
-                db_row = ConfigRow.objects.get(name=self.config_name)
-                update_fields = {}
-                if db_row.description != self.description:
-                    update_fields['description'] = self.description
-                if db_row.tags != self.tags:
-                    update_fields['tags'] = self.tags
-                if db_row.topic != self.topic:
-                    update_fields['topic'] = self.topic
-                if db_row.last_read is None or (db_row.last_read < dt_now - dt.timedelta(days=1)):
-                    update_fields['last_read'] = dt_now
-                if db_row.default_value != self.default_value:
-                    update_fields['default_value'] = self.default_value
-                if update_fields:
-                    config_row_update_signal.send(sender=None, config_name=self.config_name,
-                                                  update_fields=update_fields)
-                self.last_value = db_row.value
-            except exceptions.ObjectDoesNotExist:
-                logger.warning('no config %s in db, using default value %s',
-                               self.config_name, self.default_value)
-                self.last_value = self.default_value
-                update_fields = {
-                    "name": self.config_name,
-                    "value": self.last_value,
-                    "description": self.description,
-                    "tags": self.tags,
-                    "topic": self.topic,
-                    "last_read": dt_now,
-                    "last_set": dt_now,
-                    "default_value": self.default_value,
-                }
-                config_row_update_signal.send(
-                    sender=None, config_name=self.config_name, update_fields=update_fields)
-
-        self.next_check = now + CACHE_TTL
-        return self.last_value
+                generation = generation_check.get(now, min(descriptor.ttl for descriptor in descriptors))
+                db_rows = None
+                if not self.is_actual(generation, descriptors):
+                    db_rows = fetch_rows([descriptor.config_name for descriptor in descriptors], generation)
+            except DatabaseError:
+                if force or not self.keep_last_values(now, descriptors):
+                    raise
+                return
+            updates = self.apply(now, dt_now, generation, db_rows, descriptors)
+        send_updates(updates)
+        if snapshot_file.is_enabled():
+            if db_rows is not None:
+                snapshot_file.mark_dirty()
+            snapshot_file.maybe_save(now)
+        last_read_tracker.maybe_flush(now)
+
+    async def arefresh(self, force=False):
+        # все обновление под блокировкой группы - один вызов в потоке: threading.Lock нельзя держать через await.
+        # Иначе корутина, ждущая ту же блокировку в sync_to_async, займет поток, нужный держателю для запроса к БД
+        await sync_to_async(self.refresh)(force)
+
+    def apply(self, now, dt_now, generation, db_rows, descriptors):
+        """Раскладывает прочитанные строки по дескрипторам. db_rows=None - строки перечитывать не нужно.
+        Возвращает список (имя конфига, поля для обновления в БД)"""
+        # у конфигов с одинаковым TTL общий срок, чтобы дальше они обновлялись одним запросом
+        next_checks = {}
+        updates = []
+        for descriptor in descriptors:
+            descriptor.metrics.refreshes += 1
+            descriptor.metrics.refreshed_at = now
+            if db_rows is not None:
+                db_row = db_rows.get(descriptor.config_name)
+                if db_row is None:
+                    updates.append((descriptor.config_name, descriptor.load_default(dt_now)))
+                else:
+                    descriptor.load_row(db_row)
+                descriptor.generation = generation
+            if descriptor.ttl not in next_checks:
+                next_checks[descriptor.ttl] = self.next_check_after(now, descriptor.ttl)
+            descriptor.next_check = next_checks[descriptor.ttl]
+        return updates
+
+    def keep_last_values(self, now, descriptors):
+        """БД недоступна. Если значения уже загружались (из БД или файла снимка), продолжаем отдавать их
+        до следующей попытки и возвращаем True. Подставлять значения по умолчанию молча не будем"""
+        if any(descriptor.generation is None for descriptor in descriptors):
+            return False
+        logger.exception('failed to refresh configs %s, keeping last known values',
+                         ', '.join(descriptor.config_name for descriptor in descriptors))
+        for descriptor in descriptors:
+            descriptor.metrics.errors += 1
+            descriptor.next_check = self.next_check_after(now, descriptor.ttl)
+        return True
+
+    @staticmethod
+    def next_check_after(now, ttl):
+        # в фоновом режиме чтение никогда не ходит в БД само, значения обновляет config_refresher
+        if REFRESH_MODE == 'background':
+            return math.inf
+        return now + jittered(ttl)
+
+    def _after_fork(self):
+        # fork мог случиться, пока блокировку держал другой поток родителя: в дочернем процессе ее некому отпустить
+        self.lock = threading.Lock()
+
+
+def before_refresh(start_refresher=True):
+    if REFRESH_MODE == 'background' and start_refresher:
+        config_refresher.ensure_started()
+    if snapshot_file.is_enabled():
+        snapshot_file.ensure_seeded()
+    if SYNC_METADATA:
+        metadata_sync.ensure()
+
+
+def send_updates(updates):
+    if remote_configs.is_enabled():
+        # строки недостающих конфигов создает сервер конфигов, а не клиент
+        return
+    for config_name, update_fields in updates:
+        config_row_update_signal.send(sender=None, config_name=config_name, update_fields=update_fields)
+        config_metrics.get(config_name).signals += 1
+
+
+def fetch_rows(names, generation):
+    """Строки конфигов names не старее поколения generation: из копии сервера конфигов, общего кеша или БД"""
+    if remote_configs.is_enabled():
+        return {name: ConfigRow(name=name, value=value) for name, value in remote_configs.get_rows(names).items()}
+    db_rows = {}
+    if shared_cache.is_enabled():
+        db_rows = {name: ConfigRow(**fields) for name, fields in shared_cache.get_rows(names, generation).items()}
+        names = [name for name in names if name not in db_rows]
+        if not names:
+            return db_rows
+
+    logger.info('accessing db to grab configs %s', ', '.join(names))
+    started = time.perf_counter()
+    fetched = list(ConfigRow.objects.filter(name__in=names).only(*shared_cache.ROW_FIELDS))
+    config_metrics.record_db_query(names, time.perf_counter() - started)
+    if fetched and shared_cache.is_enabled():
+        shared_cache.add_rows(fetched, generation)
+    db_rows.update((db_row.name, db_row) for db_row in fetched)
+    return db_rows
+
+
+class GenerationCheck:
+    """ Хранит поколение конфигов из БД (или общего кеша), чтобы процесс не перечитывал его чаще,
+    чем истекает TTL обновляемых конфигов """
+
+    def __init__(self):
+        self.generation = None
+        self.checked_at = None
+        self.lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def is_stale(self, now, ttl):
+        return self.checked_at is None or now - self.checked_at > ttl
+
+    def get(self, now, ttl=CACHE_TTL):
+        if self.is_stale(now, ttl):
+            with self.lock:
+                if self.is_stale(now, ttl):
+                    started = time.perf_counter()
+                    self.generation = self.fetch()
+                    config_metrics.record_generation_check(time.perf_counter() - started)
+                    self.checked_at = now
+        return self.generation
+
+    @staticmethod
+    def fetch():
+        if remote_configs.is_enabled():
+            # поколение - версия копии конфигов, при проверке копия и обновляется
+            return remote_configs.pull()
+        if not shared_cache.is_enabled():
+            return ConfigGeneration.current()
+        generation = shared_cache.get_generation()
+        if generation is None:
+            generation = ConfigGeneration.current()
+            shared_cache.add_generation(generation)
+        return generation
+
+    def _after_fork(self):
+        self.lock = threading.Lock()
+
+
+generation_check = GenerationCheck()
+
+
+class MetadataSync:
+    """ Сверяет метаданные конфигов с БД пачкой: один раз для всех групп, появившихся с прошлой сверки """
+
+    def __init__(self, groups):
+        self.groups = groups
+        self.synced = 0
+        self.lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def is_pending(self):
+        return self.synced < len(self.groups)
+
+    def ensure(self):
+        if not self.is_pending():
+            return
+        with self.lock:
+            groups = self.groups[self.synced:]
+            if not groups:
+                return
+            try:
+                sync_metadata(descriptor for group in groups for descriptor in group.descriptors)
+            except DatabaseError:
+                # не мешаем чтению значений, сверка повторится при следующем обновлении
+                logger.exception('failed to sync configs metadata')
+                return
+            self.synced += len(groups)
+
+    def _after_fork(self):
+        self.lock = threading.Lock()
 
 
 class ConfigMeta(type):
     """ Метакласс для конфигов. Подменяет все атрибуты на десктипторы """
 
+    registry = ConfigRegistry()
+
     def __new__(cls, name, bases, dct):
         prefix = dct.get('__prefix__', '')
         topic = dct.get('__topic__', name)
@@ -92,31 +429,158 @@ class ConfigMeta(type):
         if "__annotations__" in dct:
             config_row_types = dct["__annotations__"]
 
+        ttl = dct.get('__ttl__')
+        descriptor_class = get_descriptor_class()
+        group = ConfigRowGroup(name)
         for n, v in dct.items():
             if (
                 not n.startswith('__')
                 and not n.endswith((DESCRIPTION_SUFFIX, TAGS_SUFFIX, VALIDATORS_SUFFIX))
+                and not is_ttl_option(n, dct)
             ):
                 if prefix and n in config_row_types:
                     config_row_types[prefix + n] = config_row_types.pop(n)
-                dct[n] = ConfigRowDescriptor(prefix + n, v,
-                                             description=dct.get(
-                                                 n + DESCRIPTION_SUFFIX),
-                                             tags=dct.get(n + TAGS_SUFFIX),
-                                             topic=topic)
-                validators[n] = dct.get(n + VALIDATORS_SUFFIX)
+                dct[n] = descriptor_class(prefix + n, v,
+                                          description=dct.get(
+                                              n + DESCRIPTION_SUFFIX),
+                                          tags=dct.get(n + TAGS_SUFFIX),
+                                          topic=topic,
+                                          group=group,
+                                          row_type=config_row_types.get(prefix + n),
+                                          ttl=dct.get(n + TTL_SUFFIX, ttl))
+                validators[prefix + n] = dct.get(n + VALIDATORS_SUFFIX)
 
         dct = {
             name: value
             for name, value in dct.items()
             if not name.endswith((DESCRIPTION_SUFFIX, TAGS_SUFFIX, VALIDATORS_SUFFIX))
+            and not is_ttl_option(name, dct)
         }
 
-        ConfigRow.registered_row_types.update(config_row_types)
+        ConfigRow.register_row_types(config_row_types)
         ConfigRow.validators.update(validators)
+        cls.registry.register(group, exported=exported, prefix=prefix)
         c = super().__new__(cls, name, bases, dct)
         return c
 
+    def get_descriptor(cls, name) -> ConfigRowDescriptor:
+        for klass in cls.__mro__:
+            if isinstance(klass.__dict__.get(name), ConfigRowDescriptor):
+                return klass.__dict__[name]
+        raise AttributeError(f"{cls.__name__} has no config {name}")
+
+    async def aget(cls, name):
+        """Асинхронное чтение конфига: `await MyConfig.aget("FLAG")`.
+        Использует тот же кеш, что и обычное чтение `MyConfig.FLAG`"""
+        descriptor = cls.get_descriptor(name)
+        if COUNT_HITS:
+            descriptor.metrics.hits += 1
+        if not descriptor.read_marked:
+            last_read_tracker.mark(descriptor)
+        snapshot = current_snapshot.get()
+        # в снимке конфиги лежат под полными именами (с __prefix__), а не под именами атрибутов
+        if snapshot is not None and descriptor.config_name in snapshot:
+            return snapshot[descriptor.config_name]
+        if monotonic() > descriptor.next_check:
+            await descriptor.group.arefresh()
+        return descriptor.last_value
+
+    async def arefresh(cls):
+        """Асинхронно перечитывает все конфиги класса (включая унаследованные)"""
+        groups = {}
+        for klass in reversed(cls.__mro__):
+            for value in klass.__dict__.values():
+                if isinstance(value, ConfigRowDescriptor):
+                    groups[id(value.group)] = value.group
+        for group in groups.values():
+            await group.arefresh(force=True)
+
+
+def load_snapshot() -> MappingProxyType:
+    """Значения всех зарегистрированных конфигов на один момент времени.
+    Свежие группы берутся из памяти, просроченные дочитываются одним общим запросом"""
+    before_refresh()
+    now = monotonic()
+    expired = [(group, group.expired(now)) for group in ConfigMeta.registry.groups]
+    expired = [(group, descriptors) for group, descriptors in expired if descriptors]
+    if expired:
+        try:
+            # как и в refresh: поколение не чаще раза в TTL, строки - только если оно сдвинулось
+            generation = generation_check.get(now, min(d.ttl for _, descriptors in expired for d in descriptors))
+            stale = {
+                descriptor for _, descriptors in expired for descriptor in descriptors
+                if descriptor.generation != generation
+            }
+            db_rows = fetch_rows([descriptor.config_name for descriptor in stale], generation) if stale else None
+        except DatabaseError:
+            if any(descriptor.generation is None for _, descriptors in expired for descriptor in descriptors):
+                raise
+            logger.exception('failed to refresh configs for snapshot, using last known values')
+            db_rows, expired = None, []
+        dt_now = dt.datetime.now(tz=dt.timezone.utc)
+        updates = []
+        for group, descriptors in expired:
+            with group.lock:
+                actual = [descriptor for descriptor in descriptors if descriptor not in stale]
+                updates += group.apply(now, dt_now, generation, None, actual)
+                loaded = [descriptor for descriptor in descriptors if descriptor in stale]
+                updates += group.apply(now, dt_now, generation, db_rows, loaded)
+        send_updates(updates)
+        if snapshot_file.is_enabled():
+            if db_rows is not None:
+                snapshot_file.mark_dirty()
+            snapshot_file.maybe_save(now)
+        last_read_tracker.maybe_flush(now)
+    return MappingProxyType({
+        name: descriptor.last_value for name, descriptor in ConfigMeta.registry.descriptors.items()
+    })
+
+
+def preload() -> tuple[int, int]:
+    """Загружает все строки конфигов одним запросом, раскладывает их по всем зарегистрированным дескрипторам
+    и создает недостающие строки одной вставкой. Возвращает (сколько строк прочитано, сколько создано)"""
+    # фоновый поток здесь не запускается: preload может идти в мастере gunicorn (preload_app),
+    # где поток только зря ходил бы в БД, а воркеры форкались бы посреди его обновления
+    before_refresh(start_refresher=False)
+    now = monotonic()
+    dt_now = dt.datetime.now(tz=dt.timezone.utc)
+    generation = generation_check.get(now)
+    if remote_configs.is_enabled():
+        db_rows = fetch_rows(ConfigMeta.registry.names(), generation)
+    else:
+        started = time.perf_counter()
+        db_rows = {db_row.name: db_row for db_row in ConfigRow.objects.only(*shared_cache.ROW_FIELDS)}
+        config_metrics.record_db_query(ConfigMeta.registry.names(), time.perf_counter() - started)
+
+    missing = []
+    for group in ConfigMeta.registry.groups:
+        with group.lock:
+            missing += group.apply(now, dt_now, generation, db_rows, group.descriptors)
+            if REFRESH_MODE == 'background':
+                # первое чтение в процессе проверит поколение и запустит config_refresher,
+                # строки при этом не перечитываются
+                group.expire()
+    if remote_configs.is_enabled():
+        # строки недостающих конфигов создает сервер конфигов
+        missing = []
+    if missing:
+        # вместо config_row_update_signal на каждую строку
+        created = [ConfigRow(**update_fields) for _, update_fields in missing]
+        with transaction.atomic():
+            ConfigRow.objects.bulk_create(created, batch_size=PRELOAD_BATCH_SIZE, ignore_conflicts=True)
+            ConfigGeneration.bump(rows=created)
+    if snapshot_file.is_enabled():
+        snapshot_file.save()
+    logger.info('%s configs preloaded, %s created', len(db_rows), len(missing))
+    return len(db_rows), len(missing)
+
+
+remote_configs = RemoteConfigs(REMOTE_URL, REMOTE_HEADERS, REMOTE_TIMEOUT)
+metadata_sync = MetadataSync(ConfigMeta.registry.groups)
+snapshot_file = SnapshotFile(SNAPSHOT_FILE, ConfigMeta.registry.groups, SNAPSHOT_FILE_INTERVAL)
+last_read_tracker = LastReadTracker(LAST_READ_FLUSH_INTERVAL, enabled=not REMOTE_URL)
+config_refresher = ConfigRefresher(ConfigMeta.registry.groups, REFRESH_INTERVAL, jitter=CACHE_TTL_JITTER)
+
 
 class BaseConfig(metaclass=ConfigMeta):
     """От этого класса можно наследовать конфиги.
@@ -0,0 +1,169 @@
+import copy
+import json
+import logging
+import typing
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from liveconfigs.models.models import ConfigGeneration, HistoryEvent
+
+logger = logging.getLogger(__name__)
+
+# хранить в истории не полное значение, а JSON Patch (RFC 6902) относительно предыдущего события конфига
+HISTORY_DIFF = getattr(settings, 'LC_HISTORY_DIFF', False)
+# каждое N-е событие конфига хранится полностью, чтобы восстановление значения читало не больше N событий
+HISTORY_CHECKPOINT_EVERY = getattr(settings, 'LC_HISTORY_CHECKPOINT_EVERY', 20)
+BATCH_SIZE = 500
+
+
+def escape_pointer(key) -> str:
+    return str(key).replace('~', '~0').replace('/', '~1')
+
+
+def unescape_pointer(token: str) -> str:
+    return token.replace('~1', '/').replace('~0', '~')
+
+
+def make_patch(old, new, path='') -> list[dict]:
+    """JSON Patch из old в new. Словари сравниваются по ключам, остальное заменяется целиком"""
+    # сравнение в JSON, а не через ==: для python 1 == 1.0 == True, в том числе внутри списков и словарей,
+    # а в JSON это разные значения
+    if json.dumps(old, sort_keys=True) == json.dumps(new, sort_keys=True):
+        return []
+    if not (isinstance(old, dict) and isinstance(new, dict)):
+        return [{'op': 'replace', 'path': path, 'value': new}]
+    patch = [{'op': 'remove', 'path': f'{path}/{escape_pointer(key)}'} for key in sorted(old.keys() - new.keys())]
+    for key, value in new.items():
+        key_path = f'{path}/{escape_pointer(key)}'
+        if key in old:
+            patch += make_patch(old[key], value, key_path)
+        else:
+            patch.append({'op': 'add', 'path': key_path, 'value': value})
+    return patch
+
+
+def apply_patch(document, patch: list[dict]):
+    """Применяет JSON Patch (операции add, remove, replace) к копии document"""
+    document = copy.deepcopy(document)
+    for operation in patch:
+        if operation['path'] == '':
+            document = copy.deepcopy(operation['value'])
+            continue
+        *parents, last = [unescape_pointer(token) for token in operation['path'][1:].split('/')]
+        target = document
+        for token in parents:
+            target = target[int(token)] if isinstance(target, list) else target[token]
+        if isinstance(target, list):
+            last = len(target) if last == '-' else int(last)
+        if operation['op'] == 'remove':
+            del target[last]
+        elif operation['op'] == 'add' and isinstance(target, list):
+            target.insert(last, copy.deepcopy(operation['value']))
+        else:
+            target[last] = copy.deepcopy(operation['value'])
+    return document
+
+
+def materialize(events):
+    """Значение после последнего из events: первое событие должно быть полным, остальные - патчи к нему"""
+    value = None
+    for event in events:
+        value = apply_patch(value, event.value) if event.is_patch else event.value
+    return value
+
+
+def event_value(event):
+    """Полное значение конфига на момент события. Для патча читает цепочку от ближайшего полного события"""
+    if not event.is_patch:
+        return event.value
+    checkpoint_id = HistoryEvent.objects.filter(
+        name=event.name, is_patch=False, id__lt=event.id).aggregate(id=Max('id'))['id']
+    if checkpoint_id is None:
+        logger.warning('history of config %s has no full event before %s', event.name, event.id)
+        return None
+    return materialize(HistoryEvent.objects.filter(
+        name=event.name, id__gte=checkpoint_id, id__lte=event.id).order_by('id').only('value', 'is_patch'))
+
+
+def last_values(names) -> dict[str, tuple[typing.Any, int]]:
+    """Последнее значение в истории и число патчей после полного события: по два запроса на BATCH_SIZE имен"""
+    result = {}
+    names = list(names)
+    for start in range(0, len(names), BATCH_SIZE):
+        checkpoints = (HistoryEvent.objects.filter(name__in=names[start:start + BATCH_SIZE], is_patch=False)
+                       .values('name').annotate(last_id=Max('id')).values_list('name', 'last_id'))
+        condition = Q()
+        for name, last_id in checkpoints:
+            condition |= Q(name=name, id__gte=last_id)
+        if not condition:
+            continue
+        chains = defaultdict(list)
+        for event in HistoryEvent.objects.filter(condition).order_by('id').only('name', 'value', 'is_patch'):
+            chains[event.name].append(event)
+        result.update((name, (materialize(events), len(events) - 1)) for name, events in chains.items())
+    return result
+
+
+def record_history(changes, user, edit_at=None) -> list[HistoryEvent]:
+    """Записывает в историю новые значения конфигов changes: [(имя, значение)].
+    С LC_HISTORY_DIFF значение хранится патчем к предыдущему событию, если патч короче значения"""
+    edit_at = edit_at or timezone.now()
+    if not HISTORY_DIFF:
+        return HistoryEvent.objects.bulk_create(
+            [HistoryEvent(name=name, value=value, edit_at=edit_at, edit_by=user) for name, value in changes],
+            batch_size=BATCH_SIZE)
+
+    with transaction.atomic():
+        # параллельные записи истории построили бы патчи к одному и тому же событию,
+        # поэтому они выстраиваются в очередь на строке поколения
+        list(ConfigGeneration.objects.select_for_update().filter(pk=ConfigGeneration.GLOBAL_ID))
+        previous = last_values(name for name, _ in changes)
+        events = []
+        for name, value in changes:
+            event = HistoryEvent(name=name, value=value, edit_at=edit_at, edit_by=user)
+            last_value, patches = previous.get(name, (None, None))
+            if patches is not None and patches + 1 < HISTORY_CHECKPOINT_EVERY:
+                patch = make_patch(last_value, value)
+                if len(json.dumps(patch)) < len(json.dumps(value)):
+                    event.value, event.is_patch = patch, True
+            # одно имя может встретиться в changes несколько раз
+            previous[name] = (value, patches + 1 if event.is_patch else 0)
+            events.append(event)
+        return HistoryEvent.objects.bulk_create(events, batch_size=BATCH_SIZE)
+
+
+def pruned_events(before):
+    """События, которые удалит prune_history: префикс по id до первого события не старше before.
+    По id, а не по edit_at, чтобы не выдернуть событие из середины цепочки патчей"""
+    boundary_id = HistoryEvent.objects.filter(edit_at__gte=before).aggregate(id=Min('id'))['id']
+    if boundary_id is None:
+        return HistoryEvent.objects.all(), None
+    return HistoryEvent.objects.filter(id__lt=boundary_id), boundary_id
+
+
+def prune_history(before, batch_size=1000, pause=None) -> int:
+    """Удаляет события истории старше before пачками по batch_size, каждая пачка в своей транзакции.
+    Первое оставшееся событие каждого конфига, если оно патч, сначала переписывается полным значением.
+    Возвращает число удаленных событий"""
+    to_delete, boundary_id = pruned_events(before)
+    if boundary_id is not None:
+        first_kept = (HistoryEvent.objects.filter(id__gte=boundary_id)
+                      .values('name').annotate(first_id=Min('id')).values('first_id'))
+        for event in HistoryEvent.objects.filter(id__in=first_kept, is_patch=True):
+            event.value, event.is_patch = event_value(event), False
+            event.save(update_fields=['value', 'is_patch'])
+
+    deleted = 0
+    while True:
+        ids = list(to_delete.order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        with transaction.atomic():
+            HistoryEvent.objects.filter(id__in=ids).delete()
+        deleted += len(ids)
+        if pause:
+            pause()
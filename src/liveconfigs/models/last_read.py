@@ -0,0 +1,66 @@
+import atexit
+import datetime as dt
+import logging
+import os
+import threading
+import time
+
+from django.db import DatabaseError
+from django.db.models import Q
+
+from liveconfigs.models.models import ConfigRow
+
+logger = logging.getLogger(__name__)
+
+# last_read обновляется не чаще раза в сутки, как и раньше
+LAST_READ_PRECISION = dt.timedelta(days=1)
+
+
+class LastReadTracker:
+    """Копит прочитанные в процессе конфиги и раз в interval секунд (и при выходе из процесса)
+    записывает им last_read одним UPDATE ... WHERE name IN (...). enabled=False - не писать (нет своей БД)"""
+
+    def __init__(self, interval, enabled=True):
+        self.interval = interval
+        self.enabled = enabled
+        self.descriptors = set()
+        self.next_flush = time.monotonic() + interval
+        self.lock = threading.Lock()
+        atexit.register(self.flush)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def mark(self, descriptor):
+        with self.lock:
+            self.descriptors.add(descriptor)
+            descriptor.read_marked = True
+
+    def is_due(self, now):
+        return now >= self.next_flush
+
+    def maybe_flush(self, now):
+        if self.is_due(now):
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            descriptors, self.descriptors = self.descriptors, set()
+            self.next_flush = time.monotonic() + self.interval
+            for descriptor in descriptors:
+                descriptor.read_marked = False
+        if not descriptors or not self.enabled:
+            return
+
+        dt_now = dt.datetime.now(tz=dt.timezone.utc)
+        try:
+            updated = ConfigRow.objects.filter(
+                Q(last_read__isnull=True) | Q(last_read__lt=dt_now - LAST_READ_PRECISION),
+                name__in=[descriptor.config_name for descriptor in descriptors],
+            ).update(last_read=dt_now)
+        except DatabaseError:
+            logger.exception('failed to save last_read of configs')
+            return
+        logger.debug('last_read of %s configs saved', updated)
+
+    def _after_fork(self):
+        self.lock = threading.Lock()
@@ -0,0 +1,40 @@
+import logging
+
+from django.db import transaction
+
+from liveconfigs.models.models import ConfigGeneration, ConfigRow
+
+logger = logging.getLogger(__name__)
+
+METADATA_FIELDS = ('description', 'tags', 'topic', 'default_value')
+
+
+def diff_metadata(descriptors, db_rows) -> list[ConfigRow]:
+    """Строки БД, у которых описание, теги, топик или значение по умолчанию разошлись с кодом.
+    В возвращаемых строках поля уже приведены к значениям из кода"""
+    changed = []
+    for descriptor in descriptors:
+        db_row = db_rows.get(descriptor.config_name)
+        if db_row is None:
+            continue
+        metadata = descriptor.metadata()
+        if any(getattr(db_row, field) != value for field, value in metadata.items()):
+            for field, value in metadata.items():
+                setattr(db_row, field, value)
+            changed.append(db_row)
+    return changed
+
+
+def sync_metadata(descriptors) -> list[str]:
+    """Сверяет метаданные конфигов с БД одним запросом и обновляет разошедшиеся строки одним bulk_update.
+    Возвращает имена обновленных конфигов"""
+    descriptors = list(descriptors)
+    db_rows = ConfigRow.objects.only('name', *METADATA_FIELDS).in_bulk(
+        [descriptor.config_name for descriptor in descriptors])
+    changed = diff_metadata(descriptors, db_rows)
+    if changed:
+        with transaction.atomic():
+            ConfigRow.objects.bulk_update(changed, METADATA_FIELDS, batch_size=500)
+            ConfigGeneration.bump(rows=changed)
+        logger.info('metadata of configs %s synced with code', ', '.join(row.name for row in changed))
+    return [row.name for row in changed]
@@ -4,10 +4,13 @@ import typing
 from django import VERSION
 from django.conf import settings
 from django.core import exceptions
-from django.db import models
+from django.db import models, transaction
 from typeguard import check_type, TypeCheckError, CollectionCheckStrategy
 from django.utils import timezone
 
+from liveconfigs import shared_cache
+from liveconfigs.typecheck import compile_checker
+
 if VERSION[0] == 3:
     from django.contrib.postgres.fields import JSONField
 else:
@@ -27,13 +30,30 @@ class ConfigRow(models.Model):
     last_read = models.DateTimeField(blank=True, null=True)
     last_set = models.DateTimeField(blank=True, null=True)
     default_value = JSONField(blank=True, null=True)
+    # поколение конфигов, в котором строка менялась последний раз (проставляет ConfigGeneration.bump)
+    version = models.BigIntegerField(default=0, db_index=True, editable=False)
     registered_row_types: dict[str, typing.Any] = dict()
+    # (тип, собранная compile_checker проверка или None - проверять через typeguard)
+    type_checkers: dict[str, tuple[typing.Any, typing.Any]] = dict()
     validators: dict[str, typing.Any] = dict()
 
+    @classmethod
+    def register_row_types(cls, row_types: dict):
+        cls.registered_row_types.update(row_types)
+        cls.type_checkers.update(
+            (name, (row_type, compile_checker(row_type))) for name, row_type in row_types.items())
+
     def validate_type(self):
         config_row_type = self.registered_row_types.get(self.name)
         if not config_row_type:
             return
+        compiled_type, checker = self.type_checkers.get(self.name, (None, None))
+        if compiled_type is not config_row_type:
+            checker = compile_checker(config_row_type)
+            self.type_checkers[self.name] = (config_row_type, checker)
+        if checker is not None and checker(self.value):
+            return
+        # медленный путь: typeguard проверяет то, что не умеет быстрая проверка, и формирует текст ошибки
         try:
             check_type(self.value, config_row_type, collection_check_strategy=CollectionCheckStrategy.ALL_ITEMS)
         except TypeCheckError as exc:
@@ -58,11 +78,70 @@ class ConfigRow(models.Model):
         return f"ConfigRow('{self.name}', {self.value})"
 
     def __str__(self):
-        return f"Config '{self.name}' = {self.value}, {self.description or ''}"
+        # в списке админки value не загружается (см. ConfigRowChangeList), не дочитываем его ради подписи
+        value = '...' if 'value' in self.get_deferred_fields() else self.value
+        return f"Config '{self.name}' = {value}, {self.description or ''}"
+
+
+class ConfigGeneration(models.Model):
+    """Поколение конфигов: счетчик, который увеличивается при каждой записи в ConfigRow"""
+
+    GLOBAL_ID = 1
+
+    id = models.PositiveSmallIntegerField(primary_key=True, default=GLOBAL_ID)
+    generation = models.BigIntegerField(default=0)
+    # поколение последнего удаления конфигов: изменения после более старых поколений отдаются только целиком
+    last_delete = models.BigIntegerField(default=0)
+
+    @classmethod
+    def current(cls) -> int:
+        return cls.objects.filter(pk=cls.GLOBAL_ID).values_list('generation', flat=True).first() or 0
+
+    @classmethod
+    def bump(cls, rows=(), deleted_names=()):
+        """Увеличивает поколение и проставляет его строкам rows как версию. Измененные строки rows
+        после коммита транзакции записываются в общий кеш (если он включен) под этим поколением"""
+        changes = {'generation': models.F('generation') + 1}
+        if deleted_names:
+            changes['last_delete'] = models.F('generation') + 1
+        # поколение и версии строк меняются отдельными запросами: вне транзакции читатель snapshot
+        # мог бы увидеть новое поколение без новых версий строк и пропустить их изменения
+        with transaction.atomic():
+            if not cls.objects.filter(pk=cls.GLOBAL_ID).update(**changes):
+                _, created = cls.objects.get_or_create(
+                    pk=cls.GLOBAL_ID, defaults={'generation': 1, 'last_delete': 1 if deleted_names else 0})
+                if not created:
+                    cls.objects.filter(pk=cls.GLOBAL_ID).update(**changes)
+
+            if rows:
+                rows = list(rows)
+                generation = cls.objects.filter(pk=cls.GLOBAL_ID).values('generation')
+                names = [row.name for row in rows]
+                for start in range(0, len(names), 500):
+                    ConfigRow.objects.filter(name__in=names[start:start + 500]).update(
+                        version=models.Subquery(generation))
+
+            if shared_cache.is_enabled():
+                # поколение этого изменения: к моменту коммита текущее поколение может уйти дальше
+                rows, row_generation = list(rows), cls.current()
+                transaction.on_commit(lambda: shared_cache.write_through(rows, row_generation, cls.current()))
+
+    def __str__(self):
+        return f"Config generation {self.generation}"
 
 
 class HistoryEvent(models.Model):
+    """Изменение значения конфига. При is_patch в value лежит JSON Patch к предыдущему событию
+    этого конфига (см. models/history.py)"""
+
     name = models.TextField()
     value = JSONField(blank=True, null=True)
+    is_patch = models.BooleanField(default=False)
     edit_at = models.DateTimeField(default=timezone.now)
     edit_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['name', '-edit_at'], name='lc_history_name_edit_at'),
+            models.Index(fields=['edit_at'], name='lc_history_edit_at'),
+        ]
@@ -0,0 +1,62 @@
+from collections import defaultdict
+from enum import Enum
+
+
+def tag_key(tag):
+    # теги часто объявляют как str-Enum, в БД они хранятся значениями
+    return tag.value if isinstance(tag, Enum) else tag
+
+
+class ConfigRegistry:
+    """Индекс всех объявленных в коде конфигов. Заполняется ConfigMeta при создании классов конфигов"""
+
+    def __init__(self):
+        self.groups = []
+        self.descriptors = {}
+        self.topics = defaultdict(set)
+        self.tags = defaultdict(set)
+        self.exported = set()
+        self.excluded = set()
+
+    def register(self, group, exported='__all__', prefix=''):
+        """exported - `__exported__` класса: '__all__' или список имен атрибутов без префикса"""
+        self.groups.append(group)
+        for descriptor in group.descriptors:
+            name = descriptor.config_name
+            if name in self.descriptors:
+                self.unregister(name)
+            self.descriptors[name] = descriptor
+            self.topics[descriptor.topic].add(name)
+            for tag in descriptor.tags or ():
+                self.tags[tag_key(tag)].add(name)
+            if isinstance(exported, list) and name[len(prefix):] not in exported:
+                self.excluded.add(name)
+            else:
+                self.exported.add(name)
+
+    def unregister(self, name):
+        descriptor = self.descriptors.pop(name)
+        self.topics[descriptor.topic].discard(name)
+        for tag in descriptor.tags or ():
+            self.tags[tag_key(tag)].discard(name)
+        self.exported.discard(name)
+        self.excluded.discard(name)
+
+    def __contains__(self, name):
+        return name in self.descriptors
+
+    def get(self, name):
+        return self.descriptors.get(name)
+
+    def names(self) -> set[str]:
+        return set(self.descriptors)
+
+    def names_by_topic(self, topic) -> set[str]:
+        return self.topics.get(topic, set())
+
+    def names_by_tag(self, tag) -> set[str]:
+        return self.tags.get(tag_key(tag), set())
+
+    def row_type(self, name):
+        descriptor = self.descriptors.get(name)
+        return descriptor.row_type if descriptor else None
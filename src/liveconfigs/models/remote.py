@@ -0,0 +1,112 @@
+import gzip
+import http.client
+import json
+import logging
+import os
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+from django.db import DatabaseError
+
+logger = logging.getLogger(__name__)
+
+# ошибки, после которых соединение переоткрывается: сервер мог закрыть простаивающее keep-alive соединение
+RECONNECT_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+
+class RemoteUnavailable(DatabaseError):
+    """Сервер конфигов недоступен или ответил ошибкой. Наследует DatabaseError, чтобы дескрипторы
+    обрабатывали его так же, как недоступность БД: отдавали последние известные значения"""
+
+
+class RemoteConfigs:
+    """Копия конфигов другого инстанса liveconfigs в памяти процесса (LC_REMOTE_URL).
+    Забирается с его configrow/snapshot/ по одному keep-alive соединению: первый раз целиком,
+    дальше условным запросом (If-None-Match, since=<version>), который отдает только изменения или 304"""
+
+    def __init__(self, url, headers=None, timeout=5):
+        self.url = url
+        self.headers = headers or {}
+        self.timeout = timeout
+        self.version = None
+        self.etag = None
+        self.configs = {}
+        self.connection = None
+        self.lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            # сокет родителя не должен достаться дочернему процессу, копия значений - пусть достается
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def is_enabled(self):
+        return bool(self.url)
+
+    def pull(self) -> int:
+        """Забирает изменения конфигов с сервера и возвращает их версию (поколение на сервере)"""
+        with self.lock:
+            started = time.perf_counter()
+            try:
+                response, body = self.request(self.path())
+            except (OSError, http.client.HTTPException) as exc:
+                self.close()
+                raise RemoteUnavailable(f'failed to fetch configs from {self.url}: {exc}') from exc
+            if response.status == 304:
+                return self.version
+            if response.status != 200:
+                raise RemoteUnavailable(f'failed to fetch configs from {self.url}: HTTP {response.status}')
+            try:
+                if response.getheader('Content-Encoding') == 'gzip':
+                    body = gzip.decompress(body)
+                data = json.loads(body)
+                # значения не меняются на месте: читатели без блокировки видят либо старую копию, либо новую
+                configs = data['configs'] if data['full'] else {**self.configs, **data['configs']}
+                version = data['version']
+            except (ValueError, KeyError, TypeError, OSError) as exc:
+                raise RemoteUnavailable(f'bad configs response from {self.url}: {exc}') from exc
+            self.configs, self.version, self.etag = configs, version, response.getheader('ETag')
+            logger.info('%s configs fetched from %s (version %s, full=%s) in %.3fs',
+                        len(data['configs']), self.url, version, data['full'], time.perf_counter() - started)
+            return version
+
+    def get_rows(self, names) -> dict:
+        """Значения из копии: {имя: значение} для тех names, которые есть на сервере"""
+        configs = self.configs
+        return {name: configs[name] for name in names if name in configs}
+
+    def path(self) -> str:
+        parts = urlsplit(self.url)
+        path = parts.path or '/'
+        query = parts.query
+        if self.version is not None:
+            query = '&'.join(filter(None, [query, urlencode({'since': self.version})]))
+        return f'{path}?{query}' if query else path
+
+    def request(self, path):
+        headers = {'Accept': 'application/json', 'Accept-Encoding': 'gzip', **self.headers}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = self.connect()
+            try:
+                self.connection.request('GET', path, headers=headers)
+                response = self.connection.getresponse()
+                return response, response.read()
+            except RECONNECT_ERRORS:
+                self.close()
+                if attempt:
+                    raise
+
+    def connect(self):
+        parts = urlsplit(self.url)
+        connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        return connection_class(parts.hostname, parts.port, timeout=self.timeout)
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def _after_fork(self):
+        self.connection = None
+        self.lock = threading.Lock()
@@ -0,0 +1,118 @@
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def values_json(entries) -> str:
+    return json.dumps([value for _, value in entries.values()], sort_keys=True)
+
+
+class SnapshotFile:
+    """Последние известные значения конфигов на диске (LC_SNAPSHOT_FILE).
+    Новый процесс берет значения из файла и, если поколение конфигов в БД с тех пор не менялось,
+    не читает строки конфигов совсем. Эти же значения отдаются, если БД недоступна.
+    Файл переписывается не чаще раза в interval секунд (и при выходе из процесса), и только если значения изменились.
+    Формат: {"configs": {"ИМЯ": [поколение, значение]}}"""
+
+    def __init__(self, path, groups, interval=60):
+        self.path = path
+        self.groups = groups
+        self.interval = interval
+        self.entries = None
+        self.seeded = 0
+        self.dirty = False
+        # первая запись - сразу, дальше не чаще раза в interval
+        self.next_save = time.monotonic()
+        self.lock = threading.Lock()
+        atexit.register(self.flush)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def is_enabled(self):
+        return bool(self.path)
+
+    def is_pending(self):
+        return self.entries is None or self.seeded < len(self.groups)
+
+    def read(self) -> dict:
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f)['configs']
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError, KeyError, TypeError):
+            logger.exception('failed to read configs snapshot file %s', self.path)
+            return {}
+
+    def ensure_seeded(self):
+        """Один раз читает файл и подставляет значения в еще не загруженные дескрипторы,
+        в том числе классов конфигов, импортированных позже"""
+        if not self.is_pending():
+            return
+        with self.lock:
+            if self.entries is None:
+                self.entries = self.read()
+            groups = self.groups[self.seeded:]
+            for group in groups:
+                with group.lock:
+                    for descriptor in group.descriptors:
+                        entry = self.entries.get(descriptor.config_name)
+                        if entry is not None and descriptor.generation is None:
+                            descriptor.generation, descriptor.last_value = entry
+            self.seeded += len(groups)
+
+    def mark_dirty(self):
+        """Конфиги перечитаны из БД: файл перепишется при следующем maybe_save"""
+        self.dirty = True
+
+    def maybe_save(self, now):
+        if self.dirty and now >= self.next_save:
+            self.flush()
+
+    def flush(self):
+        if self.dirty:
+            self.save()
+
+    def save(self):
+        """Записывает значения всех загруженных конфигов процесса, если они отличаются от файла.
+        Записи о конфигах, которых этот процесс не знает (другие воркеры импортируют другие классы),
+        сохраняются из прочитанного файла"""
+        with self.lock:
+            self.dirty = False
+            self.next_save = time.monotonic() + self.interval
+            previous = self.entries or {}
+            entries = dict(previous)
+            for group in self.groups:
+                for descriptor in group.descriptors:
+                    if descriptor.generation is not None:
+                        entries[descriptor.config_name] = [descriptor.generation, descriptor.last_value]
+            # одно только новое поколение файл не переписывает: со старым новый процесс один раз перечитает строки.
+            # Значения сравниваются в JSON: для python 1 == 1.0 == True
+            if entries.keys() == previous.keys() and values_json(entries) == values_json(previous):
+                return
+            self.entries = entries
+            try:
+                self.write(entries)
+            except (OSError, TypeError, ValueError):
+                logger.exception('failed to write configs snapshot file %s', self.path)
+
+    def write(self, entries):
+        # пишем во временный файл рядом и атомарно подменяем, чтобы читатели не увидели половину файла
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.liveconfigs-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'configs': entries}, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _after_fork(self):
+        self.lock = threading.Lock()
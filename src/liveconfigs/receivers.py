@@ -0,0 +1,31 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from liveconfigs.models import ConfigGeneration, ConfigRow
+
+# строки, сохраненные внутри collect_saved_rows(): поколение для них увеличивает вызывающий код одним bump
+saved_rows: ContextVar[list | None] = ContextVar('liveconfigs_saved_rows', default=None)
+
+
+@contextmanager
+def collect_saved_rows():
+    """Пока открыт контекст, сохранение ConfigRow не увеличивает поколение, а добавляет строку в список"""
+    rows = []
+    token = saved_rows.set(rows)
+    try:
+        yield rows
+    finally:
+        saved_rows.reset(token)
+
+
+@receiver(post_save, sender=ConfigRow, dispatch_uid="liveconfigs_config_row_saved")
+def config_row_saved(sender, instance, **kwargs):
+    # bulk_update и update() сигналов не шлют, там поколение увеличивается явно
+    rows = saved_rows.get()
+    if rows is not None:
+        rows.append(instance)
+        return
+    ConfigGeneration.bump(rows=[instance])
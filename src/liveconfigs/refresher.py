@@ -0,0 +1,94 @@
+import atexit
+import logging
+import os
+import random
+import threading
+import time
+
+from django.db import close_old_connections, connections
+
+logger = logging.getLogger(__name__)
+
+
+class ConfigRefresher:
+    """Фоновый поток, который с заданным интервалом обновляет все группы конфигов процесса.
+    Поток запускается лазиво при первом чтении конфига и перезапускается в дочерних процессах после fork"""
+
+    def __init__(self, groups, interval, jitter=0):
+        self.groups = groups
+        self.interval = interval
+        self.jitter = jitter
+        self.started = False
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.cycles = 0
+        self.errors = 0
+        self.last_success = None
+        self.last_duration = None
+        atexit.register(self.stop)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def ensure_started(self):
+        if self.thread is not None:
+            return
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.started = True
+            self.stop_event = threading.Event()
+            self.thread = threading.Thread(target=self.run, name='liveconfigs-refresher', daemon=True)
+            self.thread.start()
+            logger.info('liveconfigs refresher started with interval %s', self.interval)
+
+    def stop(self, timeout=None):
+        """Останавливает поток. Вызывайте при завершении воркера (gunicorn worker_exit,
+        celery worker_process_shutdown), чтобы он не оборвался посреди запроса к БД"""
+        thread = self.thread
+        if thread is None:
+            return
+        self.stop_event.set()
+        if thread is not threading.current_thread():
+            thread.join(timeout)
+        self.thread = None
+
+    def run(self):
+        try:
+            while not self.stop_event.wait(self.interval * (1 + random.uniform(0, self.jitter))):
+                self.refresh_all()
+        finally:
+            connections.close_all()
+
+    def refresh_all(self):
+        started = time.monotonic()
+        close_old_connections()
+        try:
+            for group in list(self.groups):
+                group.refresh(force=True)
+        except Exception:
+            self.errors += 1
+            logger.exception('liveconfigs background refresh failed, keeping last known values')
+        else:
+            self.last_success = time.monotonic()
+        finally:
+            self.cycles += 1
+            self.last_duration = time.monotonic() - started
+
+    def stats(self) -> dict:
+        """Метрики фонового обновления. lag - сколько секунд назад было последнее успешное обновление"""
+        return {
+            'running': self.thread is not None and self.thread.is_alive(),
+            'interval': self.interval,
+            'cycles': self.cycles,
+            'errors': self.errors,
+            'lag': None if self.last_success is None else time.monotonic() - self.last_success,
+            'last_duration': self.last_duration,
+        }
+
+    def _after_fork(self):
+        # потоки не переживают fork: в дочернем процессе поток запускается заново
+        self.thread = None
+        self.lock = threading.Lock()
+        if self.started:
+            self.ensure_started()
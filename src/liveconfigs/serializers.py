@@ -1,6 +1,13 @@
+import datetime as dt
+
+from django.core import exceptions
+from django.db import transaction
 from rest_framework import serializers
 
-from liveconfigs.models import ConfigRow
+from liveconfigs.models import ConfigGeneration, ConfigRow
+from liveconfigs.models.history import record_history
+
+BATCH_SIZE = 500
 
 
 class ConfigRowSerializer(serializers.ModelSerializer):
@@ -8,8 +15,49 @@ class ConfigRowSerializer(serializers.ModelSerializer):
         model = ConfigRow
         fields = ('name', 'value')
 
+    def validate_configs(self) -> dict[str, list[str]]:
+        """Проверяет весь импорт до записи: формат, типы и валидаторы конфигов.
+        Возвращает ошибки по имени конфига (или номеру элемента, если имени нет)"""
+        errors = {}
+        if not isinstance(self.initial_data, list):
+            return {'non_field_errors': ['Expected a list of configs']}
+
+        for i, config in enumerate(self.initial_data):
+            if not isinstance(config, dict) or 'name' not in config or 'value' not in config:
+                errors[str(i)] = ["Each config must have 'name' and 'value'"]
+                continue
+            if not isinstance(config['name'], str):
+                errors[str(i)] = ["Config 'name' must be a string"]
+                continue
+            try:
+                ConfigRow(name=config['name'], value=config['value']).clean()
+            except exceptions.ValidationError as exc:
+                errors[str(config['name'])] = exc.messages
+        return errors
+
     def update_configs(self):
-        for config in self.initial_data:
-            config_row, _ = ConfigRow.objects.get_or_create(name=config['name'])
-            config_row.value = config['value']
-            config_row.save()
+        """Применяет импорт одной транзакцией. Вызывать после validate_configs"""
+        values = {config['name']: config['value'] for config in self.initial_data}
+        request = self.context.get('request')
+        now = dt.datetime.now(tz=dt.timezone.utc)
+        with transaction.atomic():
+            existing_rows = ConfigRow.objects.in_bulk(list(values))
+            to_create, to_update = [], []
+            for name, value in values.items():
+                config_row = existing_rows.get(name)
+                if config_row is None:
+                    to_create.append(ConfigRow(name=name, value=value, last_set=now))
+                elif config_row.value != value:
+                    config_row.value = value
+                    config_row.last_set = now
+                    to_update.append(config_row)
+
+            changed_rows = to_create + to_update
+            if not changed_rows:
+                return to_create, to_update
+            ConfigRow.objects.bulk_create(to_create, batch_size=BATCH_SIZE)
+            ConfigRow.objects.bulk_update(to_update, ['value', 'last_set'], batch_size=BATCH_SIZE)
+            if request is not None and request.user.is_authenticated:
+                record_history([(row.name, row.value) for row in changed_rows], request.user, now)
+            ConfigGeneration.bump(rows=changed_rows)
+        return to_create, to_update
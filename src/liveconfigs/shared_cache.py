@@ -0,0 +1,70 @@
+import logging
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+SHARED_CACHE_ALIAS = getattr(settings, 'LC_SHARED_CACHE', None)
+SHARED_CACHE_TTL = getattr(settings, 'LC_SHARED_CACHE_TTL', 60)
+
+KEY_PREFIX = 'liveconfigs'
+GENERATION_KEY = f'{KEY_PREFIX}:generation'
+# в общем кеше только то, что нужно для чтения: метаданные сверяются отдельно
+ROW_FIELDS = ('name', 'value')
+
+
+def is_enabled() -> bool:
+    return bool(SHARED_CACHE_ALIAS)
+
+
+def row_key(generation: int, name: str) -> str:
+    # поколение в ключе: строку, закешированную при одном поколении, не прочитать как значение другого
+    return f'{KEY_PREFIX}:row:{generation}:{name}'
+
+
+def get_generation() -> int | None:
+    return caches[SHARED_CACHE_ALIAS].get(GENERATION_KEY)
+
+
+def set_generation(generation: int):
+    caches[SHARED_CACHE_ALIAS].set(GENERATION_KEY, generation, SHARED_CACHE_TTL)
+
+
+def add_generation(generation: int):
+    caches[SHARED_CACHE_ALIAS].add(GENERATION_KEY, generation, SHARED_CACHE_TTL)
+
+
+def get_rows(names, generation: int) -> dict[str, dict]:
+    """Поля строк конфигов поколения generation из общего кеша. Отсутствующих в кеше имен в результате нет"""
+    cached = caches[SHARED_CACHE_ALIAS].get_many([row_key(generation, name) for name in names])
+    return {fields['name']: fields for fields in cached.values()}
+
+
+def set_rows(rows, generation: int):
+    caches[SHARED_CACHE_ALIAS].set_many(
+        {row_key(generation, row.name): {field: getattr(row, field) for field in ROW_FIELDS} for row in rows},
+        SHARED_CACHE_TTL,
+    )
+
+
+def add_rows(rows, generation: int):
+    """Кладет в кеш прочитанные из БД строки, не перетирая то, что успела записать запись в БД.
+    Строки читаются после поколения generation, поэтому они не старее его"""
+    cache = caches[SHARED_CACHE_ALIAS]
+    for row in rows:
+        cache.add(row_key(generation, row.name), {field: getattr(row, field) for field in ROW_FIELDS},
+                  SHARED_CACHE_TTL)
+
+
+def write_through(rows, row_generation: int, generation: int):
+    """Записывает в общий кеш строки rows, измененные в поколении row_generation, и текущее поколение generation.
+    Строки остальных конфигов в новом поколении дочитываются из БД первым обратившимся процессом,
+    удаленные конфиги в нем просто не найдутся"""
+    try:
+        if rows:
+            set_rows(rows, row_generation)
+        set_generation(generation)
+    except Exception:
+        # кеш вспомогательный: при его недоступности значения дочитаются из БД по истечении TTL
+        logger.exception('failed to write configs to shared cache')
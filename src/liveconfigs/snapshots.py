@@ -0,0 +1,36 @@
+import contextlib
+
+from asgiref.sync import sync_to_async
+
+from liveconfigs.models.descriptors import current_snapshot, load_snapshot
+
+
+@contextlib.contextmanager
+def snapshot():
+    """Фиксирует значения всех конфигов на входе: внутри блока все чтения конфигов берутся из этого снимка,
+    без обновлений посреди блока и без запросов в БД. Снимок загружается не более чем двумя запросами:
+    поколение и, если оно сдвинулось, строки.
+    Вложенный snapshot() использует внешний снимок. Работает и как декоратор (например, для задач Celery)"""
+    values = current_snapshot.get()
+    if values is not None:
+        yield values
+        return
+    token = current_snapshot.set(load_snapshot())
+    try:
+        yield current_snapshot.get()
+    finally:
+        current_snapshot.reset(token)
+
+
+@contextlib.asynccontextmanager
+async def asnapshot():
+    """Асинхронный вариант snapshot() для async-кода"""
+    values = current_snapshot.get()
+    if values is not None:
+        yield values
+        return
+    token = current_snapshot.set(await sync_to_async(load_snapshot)())
+    try:
+        yield current_snapshot.get()
+    finally:
+        current_snapshot.reset(token)
@@ -0,0 +1,54 @@
+import types
+import typing
+
+JSON_SCALARS = {
+    bool: (bool,),
+    int: (int,),
+    # как и typeguard, принимаем int там, где ожидается float
+    float: (int, float),
+    str: (str,),
+}
+UNION_TYPES = (typing.Union, types.UnionType)
+
+
+def compile_checker(annotation) -> typing.Callable[[typing.Any], bool] | None:
+    """Собирает из аннотации быструю проверку значения для JSON-типов:
+    bool/int/float/str/None/Any, list[...], dict[..., ...], Union/Optional/X | Y.
+    Возвращает None, если аннотацию так проверить нельзя - тогда проверку делает typeguard.
+    Проверка никогда не принимает значение, которое отверг бы typeguard"""
+    if annotation is typing.Any or annotation is object:
+        return lambda value: True
+    if annotation is None or annotation is type(None):
+        return lambda value: value is None
+    if annotation in JSON_SCALARS:
+        scalar_types = JSON_SCALARS[annotation]
+        return lambda value: isinstance(value, scalar_types)
+    if annotation is list or annotation is dict:
+        return lambda value: isinstance(value, annotation)
+
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if origin in UNION_TYPES:
+        checkers = [compile_checker(arg) for arg in args]
+        if None in checkers:
+            return None
+        return lambda value: any(checker(value) for checker in checkers)
+    if origin is list:
+        if not args:
+            return lambda value: isinstance(value, list)
+        item_checker = compile_checker(args[0])
+        if item_checker is None:
+            return None
+        return lambda value: isinstance(value, list) and all(map(item_checker, value))
+    if origin is dict:
+        if not args:
+            return lambda value: isinstance(value, dict)
+        key_checker, value_checker = compile_checker(args[0]), compile_checker(args[1])
+        if key_checker is None or value_checker is None:
+            return None
+        return lambda value: (
+            isinstance(value, dict)
+            and all(map(key_checker, value.keys()))
+            and all(map(value_checker, value.values()))
+        )
+    return None
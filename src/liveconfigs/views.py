@@ -1,12 +1,45 @@
+import hashlib
+import json
+
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import parse_etags
 from rest_framework import status as http_status
 from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from .models import ConfigRow
+from .filters import array_contains_q
+from .metrics import CONTENT_TYPE, render_prometheus
+from .models import ConfigGeneration, ConfigRow, config_refresher
 from .serializers import ConfigRowSerializer
 
+SNAPSHOT_CHUNK_SIZE = 500
+
+
+def snapshot_etag(generation, topic, tag, since=None) -> str:
+    """Сильный ETag снимка: поколение конфигов, для изменений - поколение since, с которого они отданы,
+    и, если есть, отпечаток фильтров. У полного снимка и изменений одного поколения ETag разные"""
+    etag = str(generation) if since is None else f'{generation}-since{since}'
+    if topic is not None or tag is not None:
+        etag += '-' + hashlib.md5(json.dumps([topic, tag]).encode()).hexdigest()[:8]
+    return f'"{etag}"'
+
+
+def stream_snapshot(rows, generation, full):
+    """JSON {"version": поколение, "full": снимок целиком или только изменения, "configs": {имя: значение}}
+    частями по SNAPSHOT_CHUNK_SIZE строк"""
+    yield f'{{"version":{generation},"full":{json.dumps(full)},"configs":{{'
+    chunk, separator = [], ''
+    for name, value in rows.iterator(chunk_size=SNAPSHOT_CHUNK_SIZE):
+        chunk.append(f'{json.dumps(name, ensure_ascii=False)}:{json.dumps(value, ensure_ascii=False)}')
+        if len(chunk) == SNAPSHOT_CHUNK_SIZE:
+            yield separator + ','.join(chunk)
+            chunk, separator = [], ','
+    if chunk:
+        yield separator + ','.join(chunk)
+    yield '}}'
+
 
 class ConfigRowViewSet(viewsets.ViewSet):
     serializer_class = ConfigRowSerializer
@@ -15,6 +48,54 @@ class ConfigRowViewSet(viewsets.ViewSet):
 
     @action(methods=['post'], url_name='import_config', url_path='import_config', detail=False)
     def import_config(self, request):
-        serializer = self.serializer_class(data=request.data)
-        serializer.update_configs()
-        return Response(status=http_status.HTTP_200_OK, data={})
+        serializer = self.serializer_class(data=request.data, context={'request': request})
+        errors = serializer.validate_configs()
+        if errors:
+            return Response(status=http_status.HTTP_400_BAD_REQUEST, data={'errors': errors})
+        created, updated = serializer.update_configs()
+        return Response(status=http_status.HTTP_200_OK, data={'created': len(created), 'updated': len(updated)})
+
+    @action(methods=['get'], url_name='snapshot', url_path='snapshot', detail=False)
+    def snapshot(self, request):
+        """Значения конфигов (всех или с фильтром topic=, tag=). С since=<version> и без фильтров - только строки,
+        измененные после этого поколения. Если If-None-Match совпал с ETag, строки не читаются и отдается 304"""
+        topic = request.query_params.get('topic')
+        tag = request.query_params.get('tag')
+        since = request.query_params.get('since')
+        if since is not None:
+            try:
+                since = int(since)
+            except ValueError:
+                return Response(status=http_status.HTTP_400_BAD_REQUEST, data={'errors': {'since': ['Must be int']}})
+
+        # поколение читается раньше строк: строки могут оказаться новее его, но не старее
+        generation, last_delete = ConfigGeneration.objects.filter(pk=ConfigGeneration.GLOBAL_ID).values_list(
+            'generation', 'last_delete').first() or (0, 0)
+        # после удаления конфигов изменения с более старых поколений не передать строками, отдаем снимок целиком.
+        # С фильтром тоже целиком: строка, у которой сменились топик или теги, из выборки уходит, а в изменениях
+        # этого не передать
+        filtered = topic is not None or tag is not None
+        full = since is None or filtered or since < last_delete or since > generation
+        etag = snapshot_etag(generation, topic, tag, since=None if full else since)
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+
+        rows = ConfigRow.objects.order_by('name')
+        if topic is not None:
+            rows = rows.filter(topic=topic)
+        if tag is not None:
+            rows = rows.filter(array_contains_q(rows, 'tags', [tag]))
+        if not full:
+            rows = rows.filter(version__gt=since)
+
+        response = StreamingHttpResponse(stream_snapshot(rows.values_list('name', 'value'), generation, full),
+                                         content_type='application/json')
+        response['ETag'] = etag
+        return response
+
+    @action(methods=['get'], url_name='metrics', url_path='metrics', detail=False)
+    def metrics(self, request):
+        """Метрики конфигов текущего процесса в формате Prometheus"""
+        return HttpResponse(render_prometheus(config_refresher.stats()), content_type=CONTENT_TYPE)
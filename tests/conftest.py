@@ -0,0 +1,31 @@
+import os
+import tempfile
+
+import django
+from django.conf import settings
+from django.core.management import call_command
+
+
+def pytest_configure(config):
+    # файл, а не :memory: - потокам в тестах нужна общая БД
+    db_dir = tempfile.mkdtemp(prefix='liveconfigs-tests-')
+    settings.configure(
+        SECRET_KEY='liveconfigs-tests',
+        USE_TZ=True,
+        INSTALLED_APPS=[
+            'django.contrib.contenttypes',
+            'django.contrib.auth',
+            'rest_framework',
+            'liveconfigs',
+        ],
+        DATABASES={'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': os.path.join(db_dir, 'db.sqlite3')}},
+        DEFAULT_AUTO_FIELD='django.db.models.BigAutoField',
+        # configrow/snapshot/ для тестов клиента LC_REMOTE_URL
+        ROOT_URLCONF='liveconfigs.urls',
+        ALLOWED_HOSTS=['127.0.0.1'],
+        PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+        # сверка метаданных - отдельные запросы при первом чтении, в подсчет запросов тестов они не входят
+        LC_SYNC_METADATA=False,
+    )
+    django.setup()
+    call_command('migrate', verbosity=0)
@@ -0,0 +1,58 @@
+import asyncio
+import threading
+
+import pytest
+from asgiref.sync import ThreadSensitiveContext
+
+from liveconfigs.models import BaseConfig, ConfigRow
+from liveconfigs.models.descriptors import generation_check
+
+TIMEOUT = 10
+
+
+class AsyncConfig(BaseConfig):
+    __prefix__ = 'ASYNC'
+    FLAG: bool = False
+    NUM: int = 1
+
+
+@pytest.fixture(autouse=True)
+def config_rows():
+    ConfigRow.objects.create(name='ASYNC_FLAG', value=True)
+    ConfigRow.objects.create(name='ASYNC_NUM', value=5)
+    group = AsyncConfig.get_descriptor('FLAG').group
+    for descriptor in group.descriptors:
+        descriptor.generation = None
+    group.expire()
+    generation_check.checked_at = None
+    yield
+    ConfigRow.objects.filter(name__startswith='ASYNC_').delete()
+
+
+def run_in_thread(coroutine_function):
+    """Запускает корутину в отдельном потоке со своим циклом событий: зависание не повесит весь прогон тестов"""
+    results, errors = [], []
+
+    def run():
+        try:
+            results.append(asyncio.run(coroutine_function()))
+        except Exception as exc:
+            errors.append(exc)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(TIMEOUT)
+    assert not thread.is_alive(), 'async config reads hung'
+    assert not errors
+    return results[0]
+
+
+def test_concurrent_first_load_aget():
+    async def read():
+        # как в ASGI-обработчике django: все sync_to_async запроса выполняются в одном потоке
+        async with ThreadSensitiveContext():
+            return await asyncio.gather(AsyncConfig.aget('FLAG'), AsyncConfig.aget('NUM'))
+
+    assert run_in_thread(read) == [True, 5]
+    # группа не осталась заблокированной
+    assert AsyncConfig.FLAG is True
@@ -0,0 +1,21 @@
+import pytest
+
+from liveconfigs.models.history import apply_patch, make_patch
+
+
+@pytest.mark.parametrize('old, new', [
+    ({'a': 1, 'b': [1]}, {'a': True, 'b': [1.0]}),
+    ({'a': {'b': [0, 1]}}, {'a': {'b': [False, True]}}),
+    ([1, 2], [1.0, 2.0]),
+    ({'a': 1, 'b': 'x'}, {'a': 2, 'c': 'x/y~'}),
+    (None, {'a': 1}),
+])
+def test_patch_round_trip_keeps_json_types(old, new):
+    result = apply_patch(old, make_patch(old, new))
+
+    assert result == new
+    assert repr(result) == repr(new)
+
+
+def test_equal_values_give_empty_patch():
+    assert make_patch({'a': [1, {'b': 1.5}]}, {'a': [1, {'b': 1.5}]}) == []
@@ -0,0 +1,52 @@
+import pytest
+
+from liveconfigs.management.commands.load_config import load_config
+from liveconfigs.models import BaseConfig, ConfigRow
+from liveconfigs.models.descriptors import preload
+
+
+class LoadConfig(BaseConfig):
+    __prefix__ = 'LOAD'
+    NUM: int = 1
+    NAME: str = 'default'
+
+
+def descriptors():
+    return LoadConfig.get_descriptor('NUM').group.descriptors
+
+
+@pytest.fixture(autouse=True)
+def config_rows():
+    existing = set(ConfigRow.objects.values_list('name', flat=True))
+    ConfigRow.objects.create(name='LOAD_NUM', value=5)
+    ConfigRow.objects.create(name='LOAD_NAME', value='changed')
+    yield
+    # preload создает строки всех зарегистрированных конфигов, в том числе из других тестов
+    ConfigRow.objects.exclude(name__in=existing).delete()
+
+
+def test_reset_after_preload_restores_defaults():
+    # как при LC_PRELOAD_ON_STARTUP: в дескрипторах уже значения из БД
+    preload()
+    assert (LoadConfig.NUM, LoadConfig.NAME) == (5, 'changed')
+
+    _, to_update = load_config(reset=True, dry_run=True, descriptors=descriptors())
+    assert {db_row.name: changes['value'] for db_row, changes in to_update} == {
+        'LOAD_NUM': (5, 1),
+        'LOAD_NAME': ('changed', 'default'),
+    }
+
+    load_config(reset=True, descriptors=descriptors())
+    assert dict(ConfigRow.objects.filter(name__startswith='LOAD_').values_list('name', 'value')) == {
+        'LOAD_NUM': 1,
+        'LOAD_NAME': 'default',
+    }
+
+
+def test_missing_rows_are_created_with_defaults():
+    preload()
+    ConfigRow.objects.filter(name='LOAD_NAME').delete()
+
+    to_create, _ = load_config(descriptors=descriptors())
+
+    assert [(db_row.name, db_row.value) for db_row in to_create] == [('LOAD_NAME', 'default')]
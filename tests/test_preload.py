@@ -0,0 +1,69 @@
+import math
+import os
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from liveconfigs.models import BaseConfig, ConfigRow, config_refresher
+from liveconfigs.models import descriptors as descriptors_module
+from liveconfigs.models.descriptors import (ConfigMeta, generation_check, last_read_tracker, metadata_sync, preload,
+                                           snapshot_file)
+
+
+@pytest.fixture(autouse=True)
+def config_rows():
+    existing = set(ConfigRow.objects.values_list('name', flat=True))
+    ConfigRow.objects.create(name='PRELOAD_FLAG', value=True)
+    yield
+    # preload создает строки всех зарегистрированных конфигов, в том числе из других тестов
+    ConfigRow.objects.exclude(name__in=existing).delete()
+
+
+def test_background_preload_starts_refresher_on_first_read(monkeypatch):
+    monkeypatch.setattr(descriptors_module, 'REFRESH_MODE', 'background')
+    monkeypatch.setattr(config_refresher, 'started', False)
+
+    class PreloadConfig(BaseConfig):
+        __prefix__ = 'PRELOAD'
+        FLAG: bool = False
+
+    descriptor = PreloadConfig.get_descriptor('FLAG')
+    preload()
+
+    # как в мастере gunicorn с preload_app: значения загружены, поток не запущен
+    assert config_refresher.thread is None
+    assert descriptor.last_value is True
+    assert descriptor.next_check == -math.inf
+
+    try:
+        with CaptureQueriesContext(connection) as queries:
+            assert PreloadConfig.FLAG is True
+        assert config_refresher.thread is not None
+        assert not any('liveconfigs_configrow' in query['sql'] for query in queries)
+        assert descriptor.next_check == math.inf
+    finally:
+        config_refresher.stop(timeout=5)
+
+
+def module_locks():
+    return [group.lock for group in ConfigMeta.registry.groups] + [
+        generation_check.lock, metadata_sync.lock, snapshot_file.lock, last_read_tracker.lock, config_refresher.lock]
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs os.fork')
+def test_locks_are_released_in_forked_child():
+    locks = module_locks()
+    for lock in locks:
+        lock.acquire()
+    try:
+        pid = os.fork()
+        if pid == 0:
+            # блокировки держал родитель: без обработчиков fork в дочернем процессе их некому отпустить
+            os._exit(0 if all(lock.acquire(timeout=1) for lock in module_locks()) else 1)
+        _, status = os.waitpid(pid, 0)
+    finally:
+        for lock in locks:
+            lock.release()
+
+    assert os.WEXITSTATUS(status) == 0
@@ -0,0 +1,113 @@
+import base64
+import threading
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from liveconfigs.models import BaseConfig, ConfigGeneration, ConfigRow
+from liveconfigs.models import descriptors as descriptors_module
+from liveconfigs.models.descriptors import generation_check
+from liveconfigs.models.remote import RemoteConfigs, RemoteUnavailable
+
+
+class RemoteConfig(BaseConfig):
+    __prefix__ = 'REMOTE'
+    NUM: int = 1
+    NAME: str = 'default'
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    """Инстанс liveconfigs с configrow/snapshot/, как runserver, в фоновом потоке"""
+    server = ThreadedWSGIServer(('127.0.0.1', 0), QuietHandler)
+    server.set_app(WSGIHandler())
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def remote(server):
+    User.objects.create_user('remote', password='secret')
+    ConfigRow.objects.create(name='REMOTE_NUM', value=5)
+    ConfigRow.objects.create(name='REMOTE_NAME', value='server')
+    token = base64.b64encode(b'remote:secret').decode()
+    remote = RemoteConfigs(f'http://127.0.0.1:{server.server_port}/configrow/snapshot/',
+                           headers={'Authorization': f'Basic {token}'})
+    remote.statuses = []
+    request = remote.request
+
+    def recording_request(path):
+        response, body = request(path)
+        remote.statuses.append(response.status)
+        return response, body
+
+    remote.request = recording_request
+    yield remote
+    remote.close()
+    ConfigRow.objects.filter(name__startswith='REMOTE_').delete()
+    User.objects.filter(username='remote').delete()
+
+
+def test_full_pull_then_not_modified(remote):
+    version = remote.pull()
+
+    assert version == ConfigGeneration.current()
+    assert remote.get_rows(['REMOTE_NUM', 'REMOTE_NAME', 'REMOTE_MISSING']) == {
+        'REMOTE_NUM': 5, 'REMOTE_NAME': 'server'}
+
+    # ETag полного снимка не подходит к since=: первый условный запрос отдает пустые изменения, дальше 304
+    assert remote.pull() == version
+    assert remote.pull() == version
+    assert remote.statuses == [200, 200, 304]
+    assert remote.get_rows(['REMOTE_NUM']) == {'REMOTE_NUM': 5}
+
+
+def test_delta_is_merged_and_delete_replaces_copy(remote):
+    remote.pull()
+    row = ConfigRow.objects.get(name='REMOTE_NUM')
+    row.value = 6
+    row.save()
+
+    version = remote.pull()
+
+    assert version == ConfigGeneration.current()
+    assert remote.get_rows(['REMOTE_NUM', 'REMOTE_NAME']) == {'REMOTE_NUM': 6, 'REMOTE_NAME': 'server'}
+
+    ConfigRow.objects.filter(name='REMOTE_NAME').delete()
+    ConfigGeneration.bump(deleted_names=['REMOTE_NAME'])
+    remote.pull()
+
+    assert remote.get_rows(['REMOTE_NUM', 'REMOTE_NAME']) == {'REMOTE_NUM': 6}
+
+
+def test_configs_are_read_from_remote_and_kept_when_it_is_down(remote, server, monkeypatch):
+    monkeypatch.setattr(descriptors_module, 'remote_configs', remote)
+    group = RemoteConfig.get_descriptor('NUM').group
+
+    group.expire()
+    generation_check.checked_at = None
+    with CaptureQueriesContext(connection) as queries:
+        assert (RemoteConfig.NUM, RemoteConfig.NAME) == (5, 'server')
+    assert len(queries) == 0
+
+    server.shutdown()
+    server.server_close()
+    remote.close()
+    with pytest.raises(RemoteUnavailable):
+        remote.pull()
+
+    group.expire()
+    generation_check.checked_at = None
+    assert (RemoteConfig.NUM, RemoteConfig.NAME) == (5, 'server')
@@ -0,0 +1,26 @@
+from liveconfigs.serializers import ConfigRowSerializer
+
+
+def test_validate_configs_reports_bad_items_per_row():
+    serializer = ConfigRowSerializer(data=[
+        {'name': ['bad'], 'value': 1},
+        {'name': 5, 'value': 1},
+        {'value': 1},
+        'not a config',
+        {'name': 'UNKNOWN_CONFIG', 'value': 1},
+    ])
+
+    errors = serializer.validate_configs()
+
+    assert errors == {
+        '0': ["Config 'name' must be a string"],
+        '1': ["Config 'name' must be a string"],
+        '2': ["Each config must have 'name' and 'value'"],
+        '3': ["Each config must have 'name' and 'value'"],
+    }
+
+
+def test_validate_configs_requires_list():
+    assert ConfigRowSerializer(data={'name': 'X', 'value': 1}).validate_configs() == {
+        'non_field_errors': ['Expected a list of configs']
+    }
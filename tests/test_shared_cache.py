@@ -0,0 +1,55 @@
+import pytest
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from liveconfigs import shared_cache
+from liveconfigs.models import BaseConfig, ConfigRow
+from liveconfigs.models.descriptors import generation_check
+
+
+class SharedCacheConfig(BaseConfig):
+    __prefix__ = 'SHARED'
+    NUM: int = 1
+
+
+@pytest.fixture(autouse=True)
+def cache_enabled(monkeypatch):
+    monkeypatch.setattr(shared_cache, 'SHARED_CACHE_ALIAS', 'default')
+    ConfigRow.objects.create(name='SHARED_NUM', value=1)
+    caches['default'].clear()
+    yield
+    ConfigRow.objects.filter(name='SHARED_NUM').delete()
+    caches['default'].clear()
+
+
+def read_expired():
+    SharedCacheConfig.get_descriptor('NUM').group.expire()
+    generation_check.checked_at = None
+    return SharedCacheConfig.NUM
+
+
+def set_num(value):
+    row = ConfigRow.objects.get(name='SHARED_NUM')
+    row.value = value
+    row.save()
+
+
+def test_changed_row_is_read_from_cache():
+    assert read_expired() == 1
+    set_num(2)
+
+    with CaptureQueriesContext(connection) as queries:
+        assert read_expired() == 2
+
+    assert len(queries) == 0
+
+
+def test_cached_row_of_old_generation_is_not_used(monkeypatch):
+    assert read_expired() == 1
+    # запись в кеш после коммита не дошла, а поколение в кеше истекло: новое поколение берется из БД
+    monkeypatch.setattr(shared_cache, 'write_through', lambda *args: None)
+    set_num(2)
+    caches['default'].delete(shared_cache.GENERATION_KEY)
+
+    assert read_expired() == 2
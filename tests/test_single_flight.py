@@ -0,0 +1,94 @@
+import threading
+import time
+
+import pytest
+from django.db import connection
+
+from liveconfigs.models import BaseConfig, ConfigRow
+from liveconfigs.models.descriptors import generation_check
+
+THREADS = 32
+# задержка каждого запроса: с быстрой SQLite потоки иначе не успевают пересечься внутри обновления
+QUERY_DELAY = 0.05
+
+
+class StressConfig(BaseConfig):
+    __prefix__ = 'STRESS'
+    NUM: int = 1
+    NAME: str = 'default'
+
+
+class QueryCounter:
+    """Считает запросы всех потоков и замедляет их, как медленная БД.
+    execute_wrapper ставится на соединение каждого потока"""
+
+    def __init__(self):
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        with self.lock:
+            self.count += 1
+        time.sleep(QUERY_DELAY)
+        return execute(sql, params, many, context)
+
+
+def read_concurrently(counter):
+    barrier = threading.Barrier(THREADS)
+    values, errors = [], []
+
+    def read():
+        try:
+            with connection.execute_wrapper(counter):
+                barrier.wait()
+                values.append((StressConfig.NUM, StressConfig.NAME))
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=read) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert not any(thread.is_alive() for thread in threads)
+    assert not errors
+    return values
+
+
+def expire():
+    StressConfig.get_descriptor('NUM').group.expire()
+    generation_check.checked_at = None
+
+
+@pytest.fixture(autouse=True)
+def config_rows():
+    ConfigRow.objects.create(name='STRESS_NUM', value=5)
+    ConfigRow.objects.create(name='STRESS_NAME', value='db')
+    for descriptor in StressConfig.get_descriptor('NUM').group.descriptors:
+        descriptor.generation = None
+    expire()
+    yield
+    ConfigRow.objects.filter(name__startswith='STRESS_').delete()
+
+
+def test_concurrent_first_load_reads_db_once():
+    counter = QueryCounter()
+    values = read_concurrently(counter)
+
+    assert values == [(5, 'db')] * THREADS
+    # одна проверка поколения и одно чтение строк группы на все потоки
+    assert counter.count == 2
+
+
+def test_concurrent_refresh_of_unchanged_configs_checks_generation_once():
+    StressConfig.NUM
+    expire()
+
+    counter = QueryCounter()
+    values = read_concurrently(counter)
+
+    assert values == [(5, 'db')] * THREADS
+    # поколение не менялось, строки не перечитываются
+    assert counter.count == 1
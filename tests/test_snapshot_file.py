@@ -0,0 +1,61 @@
+import json
+import time
+
+import pytest
+
+from liveconfigs.models.descriptors import ConfigRowDescriptor
+from liveconfigs.models.snapshot_file import SnapshotFile
+
+
+@pytest.fixture
+def descriptor():
+    descriptor = ConfigRowDescriptor('SNAPSHOT_FILE_NUM', 1)
+    descriptor.generation = 1
+    return descriptor
+
+
+@pytest.fixture
+def snapshot_file(tmp_path, descriptor, monkeypatch):
+    snapshot_file = SnapshotFile(str(tmp_path / 'configs.json'), [descriptor.group], interval=60)
+    snapshot_file.writes = 0
+    write = snapshot_file.write
+
+    def counting_write(entries):
+        snapshot_file.writes += 1
+        write(entries)
+
+    monkeypatch.setattr(snapshot_file, 'write', counting_write)
+    return snapshot_file
+
+
+def test_file_is_rewritten_only_when_values_change(snapshot_file, descriptor):
+    snapshot_file.save()
+    descriptor.generation = 2
+    snapshot_file.save()
+    assert snapshot_file.writes == 1
+
+    # 1 и True равны в python, но это разные значения конфига
+    descriptor.generation, descriptor.last_value = 3, True
+    snapshot_file.save()
+    assert snapshot_file.writes == 2
+    with open(snapshot_file.path, encoding='utf-8') as f:
+        assert json.load(f) == {'configs': {'SNAPSHOT_FILE_NUM': [3, True]}}
+
+
+def test_saves_are_debounced(snapshot_file, descriptor):
+    now = time.monotonic()
+    snapshot_file.maybe_save(now)
+    assert snapshot_file.writes == 0
+
+    snapshot_file.mark_dirty()
+    snapshot_file.maybe_save(now)
+    assert snapshot_file.writes == 1
+
+    descriptor.last_value = 2
+    snapshot_file.mark_dirty()
+    snapshot_file.maybe_save(now + 1)
+    assert snapshot_file.writes == 1
+
+    # при выходе из процесса недописанные изменения сохраняются
+    snapshot_file.flush()
+    assert snapshot_file.writes == 2
@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from liveconfigs.models import BaseConfig, ConfigRow
+from liveconfigs.models.descriptors import ConfigMeta, generation_check
+from liveconfigs.snapshots import asnapshot, snapshot
+
+
+class PrefixedSnapshotConfig(BaseConfig):
+    __prefix__ = 'PSNAP'
+    FLAG: bool = False
+
+
+class PlainSnapshotConfig(BaseConfig):
+    # то же имя атрибута без префикса: в снимке он лежит под именем FLAG
+    FLAG: bool = True
+
+
+@pytest.fixture(autouse=True)
+def config_rows():
+    ConfigRow.objects.create(name='PSNAP_FLAG', value=False)
+    ConfigRow.objects.create(name='FLAG', value=True)
+    yield
+    ConfigRow.objects.filter(name__in=['PSNAP_FLAG', 'FLAG']).delete()
+
+
+def test_aget_in_snapshot_uses_prefixed_name():
+    async def read():
+        async with asnapshot():
+            return await PrefixedSnapshotConfig.aget('FLAG'), await PlainSnapshotConfig.aget('FLAG')
+
+    assert asyncio.run(read()) == (False, True)
+
+
+def test_aget_in_snapshot_does_not_refresh():
+    with snapshot():
+        ConfigRow.objects.filter(name='PSNAP_FLAG').update(value=True)
+        PrefixedSnapshotConfig.get_descriptor('FLAG').group.expire()
+        value = asyncio.run(PrefixedSnapshotConfig.aget('FLAG'))
+
+    assert value is False
+
+
+def expire_all():
+    for group in ConfigMeta.registry.groups:
+        group.expire()
+    generation_check.checked_at = None
+
+
+def test_snapshot_after_ttl_checks_generation_only():
+    # фикстура только что сдвинула поколение: загружаем все конфиги заново
+    expire_all()
+    with snapshot():
+        pass
+    # истек TTL и конфигов, и проверки поколения, а в БД ничего не менялось
+    expire_all()
+
+    with CaptureQueriesContext(connection) as queries:
+        with snapshot():
+            pass
+
+    assert len(queries) == 1
+    assert 'liveconfigs_configgeneration' in queries[0]['sql']
+
+    # снимок записал дескрипторам настоящее поколение: обычное чтение строки тоже не перечитывает
+    PrefixedSnapshotConfig.get_descriptor('FLAG').group.expire()
+    with CaptureQueriesContext(connection) as queries:
+        assert PrefixedSnapshotConfig.FLAG is False
+
+    assert len(queries) == 0
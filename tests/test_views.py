@@ -0,0 +1,82 @@
+import json
+
+import pytest
+from django.contrib.auth.models import User
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from liveconfigs.models import ConfigGeneration, ConfigRow
+from liveconfigs.models.metadata import sync_metadata
+from liveconfigs.models.descriptors import ConfigRowDescriptor
+from liveconfigs.views import ConfigRowViewSet
+
+TOPIC = 'views-tests'
+
+snapshot_view = ConfigRowViewSet.as_view({'get': 'snapshot'})
+
+
+@pytest.fixture(autouse=True)
+def config_rows():
+    ConfigRow.objects.create(name='VIEWS_A', value=1, topic=TOPIC, tags=['x', 'y'])
+    ConfigRow.objects.create(name='VIEWS_B', value=2, topic=TOPIC, tags=['y'])
+    ConfigRow.objects.create(name='VIEWS_C', value=3, topic=TOPIC, tags=['z'])
+    yield
+    ConfigRow.objects.filter(name__startswith='VIEWS_').delete()
+
+
+def get_snapshot(etag=None, **params):
+    headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+    request = APIRequestFactory().get('/configrow/snapshot/', params, **headers)
+    force_authenticate(request, user=User(username='reader'))
+    response = snapshot_view(request)
+    body = json.loads(b''.join(response.streaming_content)) if response.status_code == 200 else None
+    return response, body
+
+
+def test_full_and_delta_snapshots_have_different_etags():
+    since = ConfigGeneration.current()
+    row = ConfigRow.objects.get(name='VIEWS_A')
+    row.value = 10
+    row.save()
+
+    full, full_body = get_snapshot()
+    delta, delta_body = get_snapshot(since=since)
+
+    assert full_body['full'] is True
+    assert {'VIEWS_A': 10, 'VIEWS_B': 2}.items() <= full_body['configs'].items()
+    assert delta_body['full'] is False
+    assert delta_body['configs'] == {'VIEWS_A': 10}
+    assert full['ETag'] != delta['ETag']
+
+    # ETag полного снимка не подходит к запросу изменений и наоборот
+    assert get_snapshot(full['ETag'], since=since)[0].status_code == 200
+    assert get_snapshot(delta['ETag'])[0].status_code == 200
+    assert get_snapshot(delta['ETag'], since=since)[0].status_code == 304
+    assert get_snapshot(full['ETag'])[0].status_code == 304
+
+
+def test_etag_changes_after_save():
+    response, _ = get_snapshot(topic=TOPIC)
+    ConfigRow.objects.filter(name='VIEWS_B').get().save()
+
+    assert get_snapshot(response['ETag'], topic=TOPIC)[0].status_code == 200
+
+
+def test_tag_filter_matches_array_elements():
+    _, body = get_snapshot(tag='y')
+
+    assert body['configs'] == {'VIEWS_A': 1, 'VIEWS_B': 2}
+
+
+def test_filtered_since_is_full_after_metadata_change():
+    since = ConfigGeneration.current()
+    sync_metadata([ConfigRowDescriptor('VIEWS_A', 1, topic='views-moved', tags=['x', 'y'])])
+
+    _, delta = get_snapshot(since=since)
+    _, moved = get_snapshot(topic='views-moved', since=since)
+    _, left = get_snapshot(topic=TOPIC, since=since)
+
+    # sync_metadata проставил строке версию, изменение видно в since=
+    assert delta['configs'] == {'VIEWS_A': 1}
+    assert moved == {'version': moved['version'], 'full': True, 'configs': {'VIEWS_A': 1}}
+    assert left['full'] is True
+    assert left['configs'] == {'VIEWS_B': 2, 'VIEWS_C': 3}